@@ -1,11 +1,16 @@
+import sys
 from logging.config import fileConfig
+from pathlib import Path
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
-import models
 
+# Make the ToDo package importable when alembic runs from this directory.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from ToDo import models
+from ToDo.settings import get_settings
 
 
 # this is the Alembic Config object, which provides
@@ -27,7 +32,7 @@ target_metadata = models.Base.metadata
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
-config.set_main_option("sqlalchemy.url", "sqlite:///./todosapp.db")
+config.set_main_option("sqlalchemy.url", get_settings().database_url.replace("%", "%%"))
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -0,0 +1,28 @@
+"""add owner indexes to todos
+
+Revision ID: 5f3c2a9d8e41
+Revises: 0b89c7910dea
+Create Date: 2026-10-18 10:12:37.412093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f3c2a9d8e41'
+down_revision: Union[str, None] = '0b89c7910dea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_todos_owner_id_id', 'todos', ['owner_id', 'id'])
+    op.create_index('ix_todos_owner_id_complete_priority', 'todos', ['owner_id', 'complete', 'priority'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todos_owner_id_complete_priority', table_name='todos')
+    op.drop_index('ix_todos_owner_id_id', table_name='todos')
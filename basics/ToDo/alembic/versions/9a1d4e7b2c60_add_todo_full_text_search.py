@@ -0,0 +1,49 @@
+"""add todo full text search
+
+Revision ID: 9a1d4e7b2c60
+Revises: 5f3c2a9d8e41
+Create Date: 2026-10-18 11:02:18.907316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a1d4e7b2c60'
+down_revision: Union[str, None] = '5f3c2a9d8e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE todos_fts USING fts5("
+                   "title, description, content='todos', content_rowid='id')")
+        op.execute("CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos BEGIN "
+                   "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END")
+        op.execute("CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos BEGIN "
+                   "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+                   "VALUES ('delete', old.id, old.title, old.description); END")
+        op.execute("CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description ON todos BEGIN "
+                   "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+                   "VALUES ('delete', old.id, old.title, old.description); "
+                   "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END")
+        op.execute("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute("CREATE INDEX ix_todos_search ON todos USING gin "
+                   "(to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '')))")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER todos_fts_update")
+        op.execute("DROP TRIGGER todos_fts_delete")
+        op.execute("DROP TRIGGER todos_fts_insert")
+        op.execute("DROP TABLE todos_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX ix_todos_search")
@@ -0,0 +1,54 @@
+"""add todo change tracking
+
+Revision ID: c4e8b1f05a37
+Revises: 9a1d4e7b2c60
+Create Date: 2026-10-18 14:21:05.618230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8b1f05a37'
+down_revision: Union[str, None] = '9a1d4e7b2c60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('todos', sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('todos', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    # Existing todos get distinct revisions so a first sync with since=0 returns them all.
+    op.execute("UPDATE todos SET revision = id")
+    op.create_index('ix_todos_owner_id_revision', 'todos', ['owner_id', 'revision'])
+
+    # One counter per owner, starting after that owner's highest revision.
+    op.create_table(
+        'todo_revisions',
+        sa.Column('owner_id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+    )
+    op.execute("INSERT INTO todo_revisions (owner_id, revision) "
+               "SELECT owner_id, max(revision) FROM todos WHERE owner_id IS NOT NULL GROUP BY owner_id")
+
+    op.create_table(
+        'todo_tombstones',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('todo_id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_todo_tombstones_owner_id_revision', 'todo_tombstones', ['owner_id', 'revision'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todo_tombstones_owner_id_revision', table_name='todo_tombstones')
+    op.drop_table('todo_tombstones')
+    op.drop_table('todo_revisions')
+    op.drop_index('ix_todos_owner_id_revision', table_name='todos')
+    op.drop_column('todos', 'updated_at')
+    op.drop_column('todos', 'revision')
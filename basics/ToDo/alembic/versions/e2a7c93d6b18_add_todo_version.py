@@ -0,0 +1,26 @@
+"""add todo version
+
+Revision ID: e2a7c93d6b18
+Revises: c4e8b1f05a37
+Create Date: 2026-10-18 16:47:52.204719
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c93d6b18'
+down_revision: Union[str, None] = 'c4e8b1f05a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('todos', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    op.drop_column('todos', 'version')
@@ -0,0 +1,263 @@
+"""
+Load-test the ToDo API in-process.
+
+Seeds a fresh database with N users x M todos, then drives the real ASGI
+app through httpx with a fixed number of concurrent clients, one scenario
+at a time, and reports latency percentiles and throughput per scenario::
+
+    python -m ToDo.benchmark --users 50 --todos-per-user 200 \\
+        --requests 500 --concurrency 20 --output bench.json
+
+Compare the JSON output of two commits to spot regressions. The database
+given by ``--database-url`` is wiped first; it defaults to a throwaway
+``benchmark.db``.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import time
+from datetime import timedelta
+import httpx
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from .cache import todo_cache
+from .database import Base, engine_options, get_db, set_sqlite_pragmas, settings, to_async_url
+from .hashing import bcrypt_context
+from .main import app
+from .models import Todos, Users
+from .routers.auth import create_access_token, login_rate_limit
+from .search import create_search_index
+from .token_cache import token_cache
+
+DEFAULT_DATABASE_URL = "sqlite:///./benchmark.db"
+PASSWORD = "benchmark-password"
+SCENARIOS = ("login", "list", "create", "update", "delete", "admin_list")
+SEED_CHUNK_SIZE = 5000
+
+def reset_database(url):
+    """
+    Recreate an empty schema for ``url``, removing a SQLite file outright so
+    its full-text table starts empty too.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:"):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(parsed.database + suffix):
+                os.remove(parsed.database + suffix)
+    engine = create_engine(url, **engine_options(url, settings))
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    create_search_index(engine)
+    return engine
+
+def seed(engine, users, todos_per_user):
+    """
+    Insert ``users`` users, the first of them an admin, each owning
+    ``todos_per_user`` todos. All users share one password hash so seeding
+    does not pay for bcrypt once per user.
+
+    Returns:
+        list[dict]: The seeded users' id, username and role.
+    """
+    hashed_password = bcrypt_context.hash(PASSWORD)
+    accounts = [{"id": n, "username": f"bench_user_{n}", "role": "admin" if n == 1 else "user"}
+                for n in range(1, users + 1)]
+    with engine.begin() as connection:
+        connection.execute(insert(Users), [
+            {**account, "email": f"{account['username']}@example.com", "first_name": "Bench",
+             "last_name": str(account["id"]), "hashed_password": hashed_password,
+             "is_active": True, "phone_number": ""}
+            for account in accounts])
+        rows = ({"title": f"Todo {n} of user {account['id']}", "description": "Seeded by the benchmark",
+                 "priority": n % 5 + 1, "complete": n % 3 == 0, "owner_id": account["id"]}
+                for account in accounts for n in range(todos_per_user))
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == SEED_CHUNK_SIZE:
+                connection.execute(insert(Todos), chunk)
+                chunk = []
+        if chunk:
+            connection.execute(insert(Todos), chunk)
+    return accounts
+
+def percentile(sorted_values, fraction):
+    """Return the nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    to_ms = lambda seconds: round(seconds * 1000, 3)
+    return {"requests": len(latencies),
+            "errors": errors,
+            "elapsed_seconds": round(elapsed, 4),
+            "requests_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": to_ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+            "p50_ms": to_ms(percentile(latencies, 0.50)),
+            "p95_ms": to_ms(percentile(latencies, 0.95)),
+            "p99_ms": to_ms(percentile(latencies, 0.99)),
+            "max_ms": to_ms(latencies[-1]) if latencies else 0.0}
+
+async def run_scenario(send, requests, concurrency):
+    """
+    Call ``send(i)`` for i in ``range(requests)`` from ``concurrency``
+    concurrent workers and summarize the latencies. Any status of 400 or
+    above counts as an error.
+    """
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            response = await send(index)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+async def run_benchmark(database_url=DEFAULT_DATABASE_URL, users=10, todos_per_user=100,
+                        requests=200, concurrency=10, scenarios=SCENARIOS):
+    """
+    Seed the database and run each scenario against the app.
+
+    Args:
+        database_url (str): The database to wipe, seed and serve from.
+        users (int): The number of users to seed; the first is an admin.
+        todos_per_user (int): The number of todos each user starts with.
+        requests (int): The number of requests sent per scenario.
+        concurrency (int): The number of concurrent clients.
+        scenarios (Iterable[str]): The scenarios to run, from `SCENARIOS`.
+
+    Returns:
+        dict: The configuration and a summary per scenario.
+    """
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    seed_engine = reset_database(database_url)
+    seed_started = time.perf_counter()
+    accounts = seed(seed_engine, users, todos_per_user)
+    seed_seconds = time.perf_counter() - seed_started
+    seed_engine.dispose()
+
+    engine = create_async_engine(to_async_url(database_url), **engine_options(database_url, settings))
+    if make_url(database_url).get_backend_name() == "sqlite":
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+    session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def get_benchmark_db():
+        async with session_factory() as db:
+            yield db
+
+    # Access tokens are minted directly so only the login scenario pays for bcrypt.
+    headers = [{"Authorization": "Bearer " + create_access_token(
+        account["username"], account["id"], account["role"], timedelta(hours=1))} for account in accounts]
+    admin_headers = headers[0]
+    created = {}
+
+    async def login(i):
+        account = accounts[i % len(accounts)]
+        return await client.post("/auth/token", data={"username": account["username"], "password": PASSWORD})
+
+    async def list_todos(i):
+        return await client.get("/", params={"limit": 100}, headers=headers[i % len(headers)])
+
+    async def create_todo(i):
+        response = await client.post("/todo", headers=headers[i % len(headers)], json={
+            "title": f"Benchmark todo {i}", "description": "Created by the benchmark",
+            "priority": i % 5 + 1, "complete": False})
+        if response.status_code == 201:
+            created[i] = response.json()["id"]
+        return response
+
+    async def update_todo(i):
+        return await client.put(f"/todo/{created.get(i, 0)}", headers=headers[i % len(headers)], json={
+            "title": f"Benchmark todo {i}", "description": "Updated by the benchmark",
+            "priority": i % 5 + 1, "complete": True})
+
+    async def delete_todo(i):
+        return await client.delete(f"/todo/{created.get(i, 0)}", headers=headers[i % len(headers)])
+
+    async def admin_list(i):
+        return await client.get("/admin/todo", params={"limit": 100}, headers=admin_headers)
+
+    senders = {"login": login, "list": list_todos, "create": create_todo,
+               "update": update_todo, "delete": delete_todo, "admin_list": admin_list}
+
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides.clear()
+    app.dependency_overrides[get_db] = get_benchmark_db
+    # Every simulated client shares one address; measure bcrypt, not the login throttle.
+    app.dependency_overrides[login_rate_limit] = lambda: None
+    await todo_cache.clear()
+    token_cache.clear()
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                     base_url="http://benchmark") as client:
+            for name in SCENARIOS:
+                if name in scenarios:
+                    results[name] = await run_scenario(senders[name], requests, concurrency)
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(overrides)
+        await engine.dispose()
+
+    return {"commit": current_commit(),
+            "config": {"database": make_url(database_url).get_backend_name(), "users": users,
+                       "todos_per_user": todos_per_user, "requests": requests,
+                       "concurrency": concurrency, "seed_seconds": round(seed_seconds, 3)},
+            "scenarios": results}
+
+def current_commit():
+    """Return the checked-out git commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def format_report(report):
+    columns = ("requests", "errors", "requests_per_second", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    lines = ["scenario    " + "".join(f"{column:>20}" for column in columns)]
+    for name, summary in report["scenarios"].items():
+        lines.append(f"{name:<12}" + "".join(f"{summary[column]:>20}" for column in columns))
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ToDo API in-process.")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL,
+                        help="database to wipe and seed (default: %(default)s)")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--todos-per-user", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, dest="scenarios",
+                        help="scenario to run; repeat for several (default: all)")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmark(args.database_url, args.users, args.todos_per_user,
+                                       args.requests, args.concurrency, args.scenarios or SCENARIOS))
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import re
+import time
+import uuid
+from collections import OrderedDict
+from .settings import get_settings
+
+class MemoryCache:
+    """
+    In-process LRU cache with per-entry expiry.
+
+    Each worker process has its own copy, so an invalidation in one worker
+    is only seen by the others once their entries expire; use `RedisCache`
+    when several workers serve the same users.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value, ttl: int):
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def add(self, key: str, value, ttl: int) -> bool:
+        """Set ``key`` only if it is missing; return True if it was set."""
+        if await self.get(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+class RedisCache:
+    """
+    Cache stored in Redis, shared by every worker.
+
+    ``client`` is any object with the asyncio Redis API used here: ``get``,
+    ``set(key, value, ex=..., nx=...)``, ``delete``, ``scan_iter`` and
+    ``unlink``. Values are stored as JSON.
+    """
+
+    def __init__(self, client, prefix: str = "todoapp:cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        value = await self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    async def set(self, key: str, value, ttl: int):
+        await self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    async def add(self, key: str, value, ttl: int) -> bool:
+        """Set ``key`` only if it is missing; return True if it was set."""
+        return bool(await self.client.set(self.prefix + key, json.dumps(value), ex=ttl, nx=True))
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+    async def clear(self):
+        """Delete every key under this cache's prefix."""
+        await delete_prefix(self.client, self.prefix)
+
+async def delete_prefix(client, prefix: str, batch_size: int = 500):
+    """
+    Delete every Redis key starting with ``prefix``.
+
+    Keys are found with ``SCAN`` rather than ``KEYS`` so Redis is never
+    blocked for the whole keyspace, and removed with ``UNLINK`` in batches,
+    which frees their memory in the background.
+    """
+    # Escape glob characters so the prefix is matched literally.
+    pattern = re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*"
+    batch = []
+    async for key in client.scan_iter(match=pattern, count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            await client.unlink(*batch)
+            batch = []
+    if batch:
+        await client.unlink(*batch)
+
+def create_cache(settings=None):
+    """
+    Create the cache backend selected by the `cache_backend` setting.
+
+    Returns:
+        MemoryCache | RedisCache: The configured backend.
+    """
+    settings = settings or get_settings()
+    if settings.cache_backend == "redis":
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("cache_backend 'redis' requires the 'redis' package")
+        return RedisCache(redis.Redis.from_url(settings.cache_url))
+    return MemoryCache(settings.cache_size)
+
+def make_etag(body) -> str:
+    """Return a weak ETag for a JSON-serializable response body."""
+    digest = hashlib.sha1(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    """Return True if an `If-None-Match` header value matches `etag`."""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+class TodoCache:
+    """
+    Read-through cache of each user's todo responses.
+
+    Keys embed a random per-user generation; :meth:`invalidate` replaces
+    it, which makes every cached page and todo of that user unreachable at
+    once without having to enumerate them. A generation that expired or was
+    evicted is replaced the same way, so stale entries are never reused.
+    """
+
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def _generation(self, owner_id: int) -> str:
+        generation = await self.backend.get(f"todos:{owner_id}:generation")
+        if generation is None:
+            generation = await self._new_generation(owner_id)
+        return generation
+
+    async def _new_generation(self, owner_id: int) -> str:
+        generation = uuid.uuid4().hex
+        await self.backend.set(f"todos:{owner_id}:generation", generation, self.ttl)
+        return generation
+
+    async def get(self, owner_id: int, key: str):
+        """
+        Return the cached entry for one of a user's todo responses.
+
+        Returns:
+            tuple: ``(full_key, entry)``; ``entry`` is None on a miss and
+            ``full_key`` is what to pass to :meth:`set`.
+        """
+        full_key = f"todos:{owner_id}:{await self._generation(owner_id)}:{key}"
+        return full_key, await self.backend.get(full_key)
+
+    async def set(self, full_key: str, body, **extra):
+        """
+        Cache a response body along with its ETag.
+
+        Returns:
+            dict: The cached entry, holding ``body``, ``etag`` and ``extra``.
+        """
+        entry = {"body": body, "etag": make_etag(body), **extra}
+        await self.backend.set(full_key, entry, self.ttl)
+        return entry
+
+    async def invalidate(self, *owner_ids: int):
+        """Drop every cached response of the given users."""
+        for owner_id in set(owner_ids):
+            await self._new_generation(owner_id)
+
+    async def clear(self):
+        await self.backend.clear()
+
+todo_cache = TodoCache(create_cache(), get_settings().cache_ttl)
@@ -0,0 +1,78 @@
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from .models import TodoRevision, TodoTombstone, Todos
+
+# INSERT constructs supporting ON CONFLICT DO UPDATE, by dialect name.
+UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+async def allocate_revisions(db, owner_id: int, count: int = 1) -> int:
+    """
+    Reserve ``count`` consecutive revisions of a user's change log for the
+    current transaction.
+
+    Each user has their own counter row, created by their first write. The
+    row stays locked until the transaction ends, so one user's writers
+    commit in revision order and a client that has seen revision N can
+    never miss a later commit with a lower one, while writes of different
+    users never wait on each other.
+
+    Args:
+        db (AsyncSession): The session doing the write.
+        owner_id (int): The user whose todos are written.
+        count (int): The number of revisions to reserve.
+
+    Returns:
+        int: The first reserved revision.
+    """
+    upsert = UPSERTS[db.bind.dialect.name]
+    last = await db.scalar(upsert(TodoRevision)
+                           .values(owner_id=owner_id, revision=count)
+                           .on_conflict_do_update(index_elements=[TodoRevision.owner_id],
+                                                  set_={"revision": TodoRevision.revision + count})
+                           .returning(TodoRevision.revision))
+    return last - count + 1
+
+async def add_tombstones(db, owner_id: int, todo_ids):
+    """
+    Record the deletion of a user's todos in the change log.
+
+    Returns:
+        int: The last revision used, or None if there were no ids.
+    """
+    todo_ids = list(todo_ids)
+    if not todo_ids:
+        return None
+    first = await allocate_revisions(db, owner_id, len(todo_ids))
+    await db.execute(insert(TodoTombstone), [
+        {"todo_id": todo_id, "owner_id": owner_id, "revision": first + offset}
+        for offset, todo_id in enumerate(todo_ids)])
+    return first + len(todo_ids) - 1
+
+async def changes_since(db, owner_id: int, since: int, limit: int):
+    """
+    Return a user's changes after revision ``since``, oldest first.
+
+    Returns:
+        dict: ``revision`` (pass it as the next ``since``), ``has_more``,
+        the changed ``todos`` and the ids of ``deleted`` todos. Clients
+        apply the deletions before the changed todos, since an id can be
+        deleted and reused.
+    """
+    todos = (await db.scalars(select(Todos)
+                              .filter(Todos.owner_id == owner_id)
+                              .filter(Todos.revision > since)
+                              .order_by(Todos.revision)
+                              .limit(limit + 1))).all()
+    tombstones = (await db.execute(select(TodoTombstone.revision, TodoTombstone.todo_id)
+                                   .filter(TodoTombstone.owner_id == owner_id)
+                                   .filter(TodoTombstone.revision > since)
+                                   .order_by(TodoTombstone.revision)
+                                   .limit(limit + 1))).all()
+    changes = sorted([(todo.revision, todo) for todo in todos] + [tuple(row) for row in tombstones],
+                     key=lambda change: change[0])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    return {"revision": changes[-1][0] if changes else since,
+            "has_more": has_more,
+            "todos": [change for _, change in changes if isinstance(change, Todos)],
+            "deleted": [change for _, change in changes if not isinstance(change, Todos)]}
@@ -1,9 +1,139 @@
-from sqlalchemy import create_engine
+import time
+from threading import Lock
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.declarative import declarative_base
+from .engine_config import engine_options, sqlite_pragmas, to_async_url
+from .settings import get_settings
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./todosapp.db"
+settings = get_settings()
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+SQLALCHEMY_DATABASE_URL = settings.database_url
+
+set_sqlite_pragmas = sqlite_pragmas(settings.sqlite_busy_timeout_ms)
+
+class MeteredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that reports how long each checkout waited.
+
+    The wait is measured around the pool's own checkout, so it is only
+    recorded for sessions that actually use a connection.
+    """
+
+    metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - started)
+
+class PoolMetrics:
+    """
+    Connection pool counters collected from SQLAlchemy pool events.
+
+    Checkouts, checkins and new connections are counted by the pool event
+    listeners; the time spent waiting for a connection is recorded by
+    `MeteredAsyncQueuePool` through :meth:`record_wait`.
+    """
+
+    def __init__(self, engine):
+        self.pool = engine.pool
+        self.pool.metrics = self
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = Lock()
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def record_wait(self, seconds):
+        """Record how long a session waited to obtain a connection."""
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self):
+        """
+        Return the current pool state and counters.
+
+        Returns:
+            dict: Pool size and occupancy plus the cumulative counters.
+        """
+        pool = self.pool
+        with self._lock:
+            stats = {
+                "pool": type(pool).__name__,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "wait_count": self.wait_count,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_max": round(self.wait_max, 6),
+                "wait_seconds_avg": round(self.wait_total / self.wait_count, 6) if self.wait_count else 0.0,
+            }
+        if hasattr(pool, "checkedout"):
+            stats.update(size=pool.size(),
+                         checked_out=pool.checkedout(),
+                         idle=pool.checkedin(),
+                         overflow=pool.overflow(),
+                         max_overflow=pool._max_overflow,
+                         timeout=pool.timeout())
+        return stats
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL, settings))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+
+async_engine_options = engine_options(SQLALCHEMY_DATABASE_URL, settings)
+if "pool_size" in async_engine_options:
+    async_engine_options["poolclass"] = MeteredAsyncQueuePool
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), **async_engine_options)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+if make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() == "sqlite":
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+
+pool_metrics = PoolMetrics(async_engine.sync_engine)
+
+Base = declarative_base()
+
+async def get_db():
+    """
+    Dependency that returns an async database session.
+
+    This dependency is used as a generator to create a new database session
+    and then close it when the generator is exhausted. The session only
+    checks out a connection when it runs its first statement.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
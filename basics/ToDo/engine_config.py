@@ -0,0 +1,76 @@
+from sqlalchemy.engine import make_url
+
+# Engine configuration shared by the ToDo app and the books API. Importing
+# this module creates no engine and reads no settings.
+
+# Async drivers used in place of the blocking DBAPIs listed in requirements.txt.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def to_async_url(url):
+    """
+    Return the async-driver equivalent of a synchronous database URL.
+
+    Args:
+        url (str): A SQLAlchemy URL such as ``sqlite:///./todosapp.db`` or
+            ``postgresql+psycopg2://...``.
+
+    Returns:
+        str: The same URL using the async driver for its backend.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}'")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def engine_options(url, settings):
+    """
+    Return the keyword arguments used to create an engine for ``url``.
+
+    SQLite gets ``check_same_thread`` disabled; in-memory SQLite databases
+    keep SQLAlchemy's default single-connection pool, every other database
+    gets a sized, pre-pinged and recycled queue pool.
+
+    Args:
+        url (str): The SQLAlchemy database URL.
+        settings (Settings): The settings holding the pool configuration.
+
+    Returns:
+        dict: Keyword arguments for ``create_engine``/``create_async_engine``.
+    """
+    url = make_url(url)
+    options = {}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            return options
+    options.update(pool_size=settings.db_pool_size,
+                   max_overflow=settings.db_max_overflow,
+                   pool_timeout=settings.db_pool_timeout,
+                   pool_recycle=settings.db_pool_recycle,
+                   pool_pre_ping=settings.db_pool_pre_ping)
+    return options
+
+def sqlite_pragmas(busy_timeout_ms):
+    """
+    Return a "connect" listener switching new SQLite connections to WAL
+    journaling with a busy timeout.
+
+    WAL lets readers proceed while a writer holds the database and the busy
+    timeout makes concurrent writers wait instead of failing immediately
+    with "database is locked".
+
+    Args:
+        busy_timeout_ms (int): How long a writer waits for the lock.
+    """
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+    return set_sqlite_pragmas
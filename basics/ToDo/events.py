@@ -0,0 +1,145 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+from .settings import get_settings
+
+class Subscription:
+    """
+    One client's bounded queue of todo events.
+
+    When the client reads slower than events arrive and the queue fills up,
+    further events are dropped and a single ``resync`` event is delivered
+    once there is room, telling the client to catch up through
+    ``GET /todo/changes`` instead. :meth:`close` always gets through, so a
+    stream can be ended however far behind its client is.
+    """
+
+    def __init__(self, owner_id: int, max_size: int, token_id: str = None):
+        self.owner_id = owner_id
+        self.token_id = token_id
+        self.max_size = max_size
+        self.queue = asyncio.Queue()
+        self.lagging = False
+
+    def offer(self, event: dict):
+        if self.lagging:
+            return
+        # Keep the last slot free for the resync notice.
+        if self.queue.qsize() >= self.max_size - 1:
+            self.lagging = True
+            self.queue.put_nowait({"type": "resync"})
+            return
+        self.queue.put_nowait(event)
+
+    def close(self):
+        """Make the stream end after the events already queued."""
+        self.queue.put_nowait({"type": "close"})
+
+    async def get(self):
+        event = await self.queue.get()
+        if event["type"] == "resync":
+            self.lagging = False
+        return event
+
+class TodoEventBroker:
+    """
+    In-process fan-out of todo changes to each user's open event streams.
+
+    Publishing never blocks the writer: every subscriber has its own
+    bounded queue (see `Subscription`). Events only reach clients connected
+    to the same worker process; with several workers clients should still
+    fall back to ``GET /todo/changes`` on reconnect.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, owner_id: int, token_id: str = None) -> Subscription:
+        """
+        Open a subscription to a user's events.
+
+        Args:
+            owner_id (int): The user whose todo changes are delivered.
+            token_id (str): The ``jti`` of the access token the stream was opened with,
+                so :meth:`close` can end the streams of a single revoked token.
+        """
+        subscription = Subscription(owner_id, self.queue_size, token_id)
+        self._subscriptions[owner_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.owner_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.owner_id]
+
+    def publish(self, owner_id: int, type: str, ids, revision: int):
+        """
+        Send a change event to every open stream of a user.
+
+        Args:
+            owner_id (int): The user whose todos changed.
+            type (str): ``created``, ``updated`` or ``deleted``.
+            ids (Iterable[int]): The ids of the changed todos.
+            revision (int): The highest revision written by the change.
+        """
+        subscriptions = self._subscriptions.get(owner_id)
+        if not subscriptions:
+            return
+        event = {"type": type, "ids": list(ids), "revision": revision}
+        for subscription in subscriptions:
+            subscription.offer(event)
+
+    def close(self, owner_id: int, token_id: str = None):
+        """
+        End a user's open streams, or only those opened with the token ``token_id``.
+
+        Called when tokens are revoked, so a stream never outlives its credentials.
+        """
+        for subscription in self._subscriptions.get(owner_id, ()):
+            if token_id is None or subscription.token_id == token_id:
+                subscription.close()
+
+    def subscriber_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+def format_event(event: dict) -> str:
+    """Encode an event as a Server-Sent Events message."""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+async def event_stream(broker: TodoEventBroker, subscription: Subscription, keepalive: float,
+                       expires_at: float = None):
+    """
+    Yield a subscription's events as Server-Sent Events, with a comment
+    line every ``keepalive`` seconds of silence so proxies keep the
+    connection open.
+
+    The stream ends when the subscription is closed or at ``expires_at``,
+    the expiry of the access token it was opened with; the client then
+    reconnects with fresh credentials. The subscription is removed when the
+    stream ends or the client goes away.
+    """
+    try:
+        yield ": connected\n\n"
+        while True:
+            timeout = keepalive
+            if expires_at is not None:
+                timeout = min(timeout, expires_at - time.time())
+                if timeout <= 0:
+                    return
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout)
+            except asyncio.TimeoutError:
+                if expires_at is None or time.time() < expires_at:
+                    yield ": keepalive\n\n"
+                continue
+            if event["type"] == "close":
+                return
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+todo_events = TodoEventBroker(get_settings().event_queue_size)
@@ -0,0 +1,66 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette import status
+from .settings import get_settings
+
+settings = get_settings()
+
+bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+class PasswordHasher:
+    """
+    Run bcrypt hashing and verification on a bounded thread pool.
+
+    bcrypt releases the GIL while it works, so a thread pool spreads the
+    hashing over the available cores while the event loop keeps serving
+    other requests. At most ``workers`` calls run at once and at most
+    ``queue_depth`` more may wait; further calls are rejected with 503
+    instead of piling up behind the pool.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, queue_depth: int):
+        self.context = context
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    async def _run(self, func, *args):
+        if self.pending >= self.workers + self.queue_depth:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many concurrent password operations",
+                                headers={"Retry-After": "1"})
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password on the worker pool.
+
+        Args:
+            password (str): The plain text password.
+
+        Returns:
+            str: The bcrypt hash.
+        """
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Verify a password against a bcrypt hash on the worker pool.
+
+        Args:
+            password (str): The plain text password.
+            hashed_password (str): The stored bcrypt hash.
+
+        Returns:
+            bool: True if the password matches.
+        """
+        return await self._run(self.context.verify, password, hashed_password)
+
+password_hasher = PasswordHasher(bcrypt_context, settings.hash_workers, settings.hash_queue_depth)
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from sqlalchemy import text
+from .database import async_engine, pool_metrics
+from .instrumentation import app_metrics
+from .settings import get_settings
+
+class ReadinessProbe:
+    """
+    Decides whether this worker should receive traffic.
+
+    A worker is ready when a ``SELECT 1`` succeeds within the ping timeout,
+    its connection pool is below the saturation limit and it is serving
+    fewer requests than the in-flight limit. The ping result is cached for
+    ``cache_seconds`` and concurrent probes share one ping, so frequent
+    load balancer checks cost at most one query per interval.
+    """
+
+    def __init__(self, engine, pool_metrics, metrics, settings):
+        self.engine = engine
+        self.pool_metrics = pool_metrics
+        self.metrics = metrics
+        self.cache_seconds = settings.readiness_cache_seconds
+        self.ping_timeout = settings.readiness_ping_timeout
+        self.max_in_flight = settings.readiness_max_in_flight
+        self.max_pool_saturation = settings.readiness_max_pool_saturation
+        self._ping_error = None
+        self._pinged_at = None
+        self._lock = asyncio.Lock()
+
+    async def _ping(self):
+        async with self.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    async def ping(self):
+        """
+        Return None if the database answers, else the reason it did not.
+        """
+        async with self._lock:
+            now = time.monotonic()
+            if self._pinged_at is None or now - self._pinged_at >= self.cache_seconds:
+                try:
+                    await asyncio.wait_for(self._ping(), self.ping_timeout)
+                    self._ping_error = None
+                except asyncio.TimeoutError:
+                    self._ping_error = f"database ping timed out after {self.ping_timeout}s"
+                except Exception as error:
+                    self._ping_error = f"database ping failed: {type(error).__name__}"
+                self._pinged_at = time.monotonic()
+            return self._ping_error
+
+    def pool_saturation(self):
+        """
+        Return the fraction of the pool's connections (including overflow)
+        checked out, or None for pools without a fixed size.
+        """
+        snapshot = self.pool_metrics.snapshot()
+        if "size" not in snapshot:
+            return None
+        capacity = snapshot["size"] + max(snapshot["max_overflow"], 0)
+        return round(snapshot["checked_out"] / capacity, 4) if capacity else None
+
+    async def check(self):
+        """
+        Run the readiness checks.
+
+        Returns:
+            tuple: ``(ready, body)``; ``body`` reports each check and, when
+            not ready, the reasons why.
+        """
+        reasons = []
+        ping_error = await self.ping()
+        if ping_error:
+            reasons.append(ping_error)
+        saturation = self.pool_saturation()
+        if saturation is not None and saturation >= self.max_pool_saturation:
+            reasons.append(f"connection pool {saturation:.0%} checked out")
+        in_flight = self.metrics.in_flight
+        if in_flight > self.max_in_flight:
+            reasons.append(f"{in_flight} requests in flight")
+        body = {"status": "Unavailable" if reasons else "Ready",
+                "database": "unavailable" if ping_error else "ok",
+                "pool_saturation": saturation,
+                "in_flight": in_flight}
+        if reasons:
+            body["reasons"] = reasons
+        return not reasons, body
+
+readiness_probe = ReadinessProbe(async_engine, pool_metrics, app_metrics, get_settings())
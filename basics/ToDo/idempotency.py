@@ -0,0 +1,174 @@
+import hashlib
+import heapq
+import hmac
+import json
+import math
+import time
+from typing import Annotated, Optional
+from fastapi import Header, HTTPException
+from fastapi.responses import JSONResponse
+from starlette import status
+from .cache import RedisCache
+from .settings import get_settings
+
+idempotency_key_header = Annotated[Optional[str], Header(min_length=1, max_length=255)]
+
+class MemoryIdempotencyBackend:
+    """
+    In-process storage for idempotency keys.
+
+    Unlike `MemoryCache`, entries are never evicted to make room: a key is
+    only dropped once its TTL has passed, so a retry within the TTL always
+    finds the first request. When ``max_size`` live keys are held, new keys
+    are refused with a 503 instead. Expired keys are popped from a heap
+    ordered by expiry as new keys are added.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = {}
+        self._expiries = []
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    async def set(self, key: str, value, ttl: int):
+        expires_at = time.time() + ttl
+        self._entries[key] = (expires_at, value)
+        heapq.heappush(self._expiries, (expires_at, key))
+
+    async def add(self, key: str, value, ttl: int) -> bool:
+        """
+        Set ``key`` only if it is missing; return True if it was set.
+
+        Raises:
+            HTTPException: 503 with a `Retry-After` header when the store is full.
+        """
+        now = time.time()
+        self._purge_expired(now)
+        if key in self._entries:
+            return False
+        if len(self._entries) >= self.max_size:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many idempotent requests, try again later",
+                                headers={"Retry-After": str(max(1, math.ceil(self._expiries[0][0] - now)))})
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+        self._expiries.clear()
+
+    def _purge_expired(self, now: float):
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiries)
+            # Skip heap entries left behind by keys that were since set again or deleted.
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == expires_at:
+                del self._entries[key]
+        if len(self._expiries) > 2 * len(self._entries) + 100:
+            self._expiries = [(expires_at, key) for key, (expires_at, _) in self._entries.items()]
+            heapq.heapify(self._expiries)
+
+def create_idempotency_backend(settings=None):
+    """
+    Create the storage for idempotency keys, kept apart from the response cache.
+
+    With the `redis` cache backend the keys are shared by every worker under
+    their own prefix; that Redis must not evict keys under memory pressure.
+
+    Returns:
+        MemoryIdempotencyBackend | RedisCache: The configured backend.
+    """
+    settings = settings or get_settings()
+    if settings.cache_backend == "redis":
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("cache_backend 'redis' requires the 'redis' package")
+        return RedisCache(redis.Redis.from_url(settings.cache_url), prefix="todoapp:idempotency:")
+    return MemoryIdempotencyBackend(settings.idempotency_max_keys)
+
+class IdempotencyStore:
+    """
+    Remembers the responses of requests sent with an ``Idempotency-Key``.
+
+    :meth:`start` claims a key with a pending marker before the handler
+    runs, so a retry that arrives while the first request is still running
+    gets a 409 instead of writing twice. :meth:`finish` replaces the marker
+    with the response, which later retries get back from :meth:`start`
+    without doing the work again. A key reused with a different request body
+    is rejected with a 422. Only a fingerprint of the body is stored, keyed
+    with the app's secret, never the body itself.
+    """
+
+    def __init__(self, backend, ttl: int, secret: str):
+        self.backend = backend
+        self.ttl = ttl
+        self._secret = secret.encode()
+
+    def fingerprint(self, payload) -> str:
+        body = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hmac.new(self._secret, body, hashlib.sha256).hexdigest()
+
+    async def start(self, scope: str, key: Optional[str], payload):
+        """
+        Claim ``key`` for a request, or return the response to replay.
+
+        Args:
+            scope (str): Separates keys of different endpoints and users.
+            key (str): The `Idempotency-Key` header; None disables idempotency.
+            payload: The request body, used to detect a reused key.
+
+        Returns:
+            JSONResponse: The stored response if the request already completed, else None.
+
+        Raises:
+            HTTPException: 409 if the first request with this key is still running,
+                422 if the key was used with a different body.
+        """
+        if key is None:
+            return None
+        fingerprint = self.fingerprint(payload)
+        storage_key = f"{scope}:{key}"
+        if await self.backend.add(storage_key, {"fingerprint": fingerprint}, self.ttl):
+            return None
+        entry = await self.backend.get(storage_key)
+        if entry is None:
+            # Expired between the two calls; treat it as new.
+            await self.backend.set(storage_key, {"fingerprint": fingerprint}, self.ttl)
+            return None
+        if entry["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                                detail="Idempotency-Key was already used with a different request")
+        if "status_code" not in entry:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="A request with this Idempotency-Key is in progress")
+        return JSONResponse(entry["body"], status_code=entry["status_code"],
+                            headers={"Idempotent-Replayed": "true"})
+
+    async def finish(self, scope: str, key: Optional[str], payload, status_code: int, body):
+        """Store the response of a request claimed by :meth:`start`."""
+        if key is None:
+            return
+        await self.backend.set(f"{scope}:{key}",
+                               {"fingerprint": self.fingerprint(payload), "status_code": status_code, "body": body},
+                               self.ttl)
+
+    async def abort(self, scope: str, key: Optional[str]):
+        """Release a key whose request failed, so it can be retried."""
+        if key is None:
+            return
+        await self.backend.delete(f"{scope}:{key}")
+
+    async def clear(self):
+        await self.backend.clear()
+
+idempotency_store = IdempotencyStore(create_idempotency_backend(), get_settings().idempotency_ttl,
+                                     get_settings().secret_key)
@@ -0,0 +1,200 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from sqlalchemy import event
+from .database import async_engine
+from .settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+class RequestStats:
+    """Database work done while serving one request."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+# Set by `MetricsMiddleware` for the duration of each request. SQLAlchemy
+# runs the cursor events of async sessions in a greenlet that shares the
+# request task's context, so the hooks below see the same object.
+current_request_stats = ContextVar("current_request_stats", default=None)
+
+class Histogram:
+    """
+    Cumulative Prometheus histogram with one series per label set.
+    """
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self._series.items()):
+            labels = format_labels(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                bucket_labels = format_labels([*zip(self.labels, label_values), ("le", bound)])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+def format_labels(pairs):
+    pairs = list(pairs)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def render_metric(name, kind, documentation, value):
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+class AppMetrics:
+    """
+    Request latency and per-request database metrics.
+
+    Requests are labelled with their route template (``/todo/{id}``)
+    rather than the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, slow_query_seconds):
+        self.slow_query_seconds = slow_query_seconds
+        self.slow_queries = 0
+        self.in_flight = 0
+        self.open_streams = 0
+        self.latency = Histogram("http_request_duration_seconds", "Time spent serving HTTP requests.",
+                                 ("method", "route", "status"), LATENCY_BUCKETS)
+        self.query_count = Histogram("http_request_db_queries", "SQL statements executed per HTTP request.",
+                                     ("method", "route"), QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram("http_request_db_seconds", "Time spent in SQL statements per HTTP request.",
+                                 ("method", "route"), DB_TIME_BUCKETS)
+        self._lock = Lock()
+
+    def record_request(self, method, route, status, seconds, stats):
+        with self._lock:
+            self.latency.observe(seconds, method, route, str(status))
+            self.query_count.observe(stats.queries, method, route)
+            self.db_time.observe(stats.db_seconds, method, route)
+
+    def record_query(self, statement, seconds):
+        """
+        Add a finished statement to the current request's stats and log it
+        if it took longer than the slow-query threshold.
+        """
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += seconds
+        if seconds >= self.slow_query_seconds:
+            with self._lock:
+                self.slow_queries += 1
+            logger.warning("Slow query (%.1f ms): %s", seconds * 1000, statement)
+
+    def instrument(self, engine):
+        """
+        Time every statement run on a synchronous engine (use
+        ``async_engine.sync_engine`` for an async one).
+        """
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    # The start time lives on the statement's execution context rather than
+    # the connection: a statement that raises never reaches the "after" hook,
+    # and its context is discarded with it instead of lingering on the
+    # pooled connection.
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.record_query(statement, time.perf_counter() - context._query_started)
+
+    def render(self):
+        """
+        Return the request metrics in the Prometheus text format.
+
+        Returns:
+            list[str]: The exposition lines.
+        """
+        with self._lock:
+            lines = self.latency.render() + self.query_count.render() + self.db_time.render()
+            lines += render_metric("db_slow_queries_total", "counter",
+                                   "SQL statements slower than the slow-query threshold.", self.slow_queries)
+            lines += render_metric("http_requests_in_flight", "gauge",
+                                   "HTTP requests currently being served.", self.in_flight)
+            lines += render_metric("http_event_streams_open", "gauge",
+                                   "Server-Sent Event streams currently open.", self.open_streams)
+        return lines
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times each HTTP request, records the database
+    work it did and counts the requests in flight.
+
+    The request is timed until its last body chunk is sent, so streamed
+    responses include the queries run while streaming. Server-Sent Event
+    streams stay open for as long as the client listens, so once their
+    response starts they are counted as open streams instead and left out
+    of the request histograms.
+    """
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        event_stream = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers", ())).get(b"content-type", b"")
+                if content_type.startswith(b"text/event-stream"):
+                    event_stream = True
+                    self.metrics.in_flight -= 1
+                    self.metrics.open_streams += 1
+            await send(message)
+
+        started = time.perf_counter()
+        self.metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_stats.reset(token)
+            if event_stream:
+                self.metrics.open_streams -= 1
+                return
+            self.metrics.in_flight -= 1
+            route = scope.get("route")
+            route = route.path if route is not None else "<unmatched>"
+            self.metrics.record_request(scope["method"], route, status_code,
+                                        time.perf_counter() - started, stats)
+
+app_metrics = AppMetrics(get_settings().slow_query_ms / 1000)
+app_metrics.instrument(async_engine.sync_engine)
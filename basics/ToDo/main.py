@@ -1,17 +1,40 @@
 from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse
+from starlette import status
 from .models import Base
 from .database import engine
-from .routers import auth, todos, admin, user
+from .search import create_search_index
+from .health import readiness_probe
+from .instrumentation import MetricsMiddleware, app_metrics
+from .routers import auth, todos, admin, user, metrics
 
 app = FastAPI()
+app.add_middleware(MetricsMiddleware, metrics=app_metrics)
 
 Base.metadata.create_all(bind=engine)
+create_search_index(engine)
 
 @app.get("/healthy")
 def health_check():
-    return {"status": "healthy"}
+    """
+    Liveness check: the process is up and serving requests.
+    """
+    return {"status": "Healthy"}
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness check for the load balancer.
+
+    Returns 503 while the database does not answer, the connection pool is
+    nearly exhausted or too many requests are in flight, so traffic is
+    routed to other workers until this one recovers.
+    """
+    ready, body = await readiness_probe.check()
+    return JSONResponse(body, status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
 
 app.include_router(auth.router)
 app.include_router(todos.router)
 app.include_router(admin.router)
-app.include_router(user.router)
\ No newline at end of file
+app.include_router(user.router)
+app.include_router(metrics.router)
\ No newline at end of file
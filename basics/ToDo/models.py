@@ -1,5 +1,9 @@
+from datetime import datetime, timezone
 from .database import Base 
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, String, Boolean, ForeignKey, Index
+
+def utcnow():
+    return datetime.now(timezone.utc)
 
 class Users(Base):
     __tablename__="users"
@@ -23,4 +27,41 @@ class Todos(Base):
     description = Column(String)
     priority = Column(Integer, default=1)
     complete = Column(Boolean, default=False)
-    owner_id = Column(Integer, ForeignKey(Users.id))
\ No newline at end of file
+    owner_id = Column(Integer, ForeignKey(Users.id))
+    # Position in the owner's change log, allocated from `TodoRevision` on every write.
+    revision = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+    # Bumped by every update; the todo's ETag for optimistic concurrency control.
+    version = Column(Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        # Per-owner listing, keyset-paginated on id.
+        Index("ix_todos_owner_id_id", "owner_id", "id"),
+        # Per-owner listing filtered on complete/priority.
+        Index("ix_todos_owner_id_complete_priority", "owner_id", "complete", "priority"),
+        # Per-owner change feed.
+        Index("ix_todos_owner_id_revision", "owner_id", "revision"),
+    )
+
+
+class TodoRevision(Base):
+    """Per-owner counter holding the last revision handed out for that user's todos."""
+    __tablename__ = "todo_revisions"
+
+    owner_id = Column(Integer, primary_key=True, autoincrement=False)
+    revision = Column(Integer, nullable=False, default=0)
+
+
+class TodoTombstone(Base):
+    """Record of a deleted todo, kept so clients can sync the deletion."""
+    __tablename__ = "todo_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    todo_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, nullable=False)
+    revision = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), default=utcnow)
+
+    __table_args__ = (
+        Index("ix_todo_tombstones_owner_id_revision", "owner_id", "revision"),
+    )
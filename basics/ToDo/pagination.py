@@ -0,0 +1,139 @@
+from typing import Optional
+from fastapi import HTTPException, Query, Response
+from pydantic import BaseModel
+from sqlalchemy import select
+from .models import Todos
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+TODO_FIELDS = ("id", "title", "description", "priority", "complete", "owner_id")
+
+class TodoFieldsResponse(BaseModel):
+    """
+    A todo limited to the fields requested with `fields=`.
+
+    Routes using it set `response_model_exclude_unset=True` so fields that
+    were not selected are left out of the response instead of sent as null.
+    """
+    id: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    priority: Optional[int] = None
+    complete: Optional[bool] = None
+    owner_id: Optional[int] = None
+
+class TodoPage:
+    """
+    Query parameters shared by the paginated todo listings.
+
+    Used as a FastAPI dependency: ``cursor`` is the id of the last todo of
+    the previous page (keyset pagination on ``Todos.id``), ``fields`` a
+    comma separated projection and ``complete``/``priority`` optional
+    filters.
+    """
+
+    def __init__(self,
+                 cursor: Optional[int] = Query(default=None, gt=0),
+                 limit: int = Query(default=DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+                 fields: Optional[str] = Query(default=None),
+                 complete: Optional[bool] = Query(default=None),
+                 priority: Optional[int] = Query(default=None, gt=0, lt=6)):
+        self.cursor = cursor
+        self.limit = limit
+        self.fields = parse_fields(fields)
+        self.complete = complete
+        self.priority = priority
+
+    def statement(self, *criteria):
+        """
+        Build the SELECT for one page.
+
+        One row more than ``limit`` is requested so the caller can tell
+        whether a next page exists without a COUNT query.
+
+        Args:
+            *criteria: Extra WHERE clauses, e.g. the owner filter.
+
+        Returns:
+            Select: The statement selecting the projected columns.
+        """
+        columns = [getattr(Todos, field) for field in self.fields]
+        if "id" not in self.fields:
+            columns.append(Todos.id)
+        stmt = select(*columns).where(*criteria)
+        if self.cursor is not None:
+            stmt = stmt.where(Todos.id > self.cursor)
+        if self.complete is not None:
+            stmt = stmt.where(Todos.complete == self.complete)
+        if self.priority is not None:
+            stmt = stmt.where(Todos.priority == self.priority)
+        return stmt.order_by(Todos.id).limit(self.limit + 1)
+
+    def cache_key(self):
+        """Return a string identifying this page, for caching its result."""
+        return (f"cursor={self.cursor}&limit={self.limit}&fields={','.join(self.fields)}"
+                f"&complete={self.complete}&priority={self.priority}")
+
+    async def fetch_page(self, db, *criteria):
+        """
+        Execute the page query and return the projected rows.
+
+        Args:
+            db (AsyncSession): The database session to use.
+            *criteria: Extra WHERE clauses, e.g. the owner filter.
+
+        Returns:
+            tuple: The rows of the page as dicts limited to the requested
+            fields, and the cursor of the next page or None on the last page.
+        """
+        rows = (await db.execute(self.statement(*criteria))).mappings().all()
+        next_cursor = None
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            next_cursor = rows[-1]["id"]
+        return [{field: row[field] for field in self.fields} for row in rows], next_cursor
+
+    async def fetch(self, db, response: Response, *criteria):
+        """
+        Execute the page query and return the projected rows.
+
+        The id of the last returned row is sent in the ``X-Next-Cursor``
+        header when more rows are available.
+
+        Args:
+            db (AsyncSession): The database session to use.
+            response (Response): The response to set the cursor header on.
+            *criteria: Extra WHERE clauses, e.g. the owner filter.
+
+        Returns:
+            list[dict]: The rows of the page, limited to the requested fields.
+        """
+        rows, next_cursor = await self.fetch_page(db, *criteria)
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = str(next_cursor)
+        return rows
+
+def parse_fields(fields):
+    """
+    Validate a comma separated ``fields`` parameter.
+
+    Args:
+        fields (str): The requested field names, or None for all fields.
+
+    Returns:
+        tuple[str]: The requested field names in request order.
+
+    Raises:
+        HTTPException: If a field name is not a todo column.
+    """
+    if not fields:
+        return TODO_FIELDS
+    requested = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    if not requested:
+        return TODO_FIELDS
+    unknown = [field for field in requested if field not in TODO_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
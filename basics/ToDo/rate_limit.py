@@ -0,0 +1,134 @@
+import math
+import time
+from collections import OrderedDict
+from fastapi import HTTPException, Request
+from starlette import status
+from .cache import delete_prefix
+from .settings import get_settings
+
+class MemoryRateLimiter:
+    """
+    In-process token buckets, one per key.
+
+    Each worker process keeps its own buckets, so with N workers a client
+    gets up to N times the configured rate; use `RedisRateLimiter` to share
+    the buckets between workers. The least recently used buckets are
+    dropped beyond ``max_size`` keys.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._buckets = OrderedDict()
+
+    async def hit(self, key: str, capacity: int, rate: float) -> float:
+        """
+        Take a token from the bucket for ``key``.
+
+        Args:
+            key (str): The bucket to draw from.
+            capacity (int): The bucket size, i.e. the allowed burst.
+            rate (float): The tokens added back per second.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until one is available.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_size:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    async def clear(self):
+        self._buckets.clear()
+
+# Refill, take a token and store the bucket in one atomic step.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate))
+return tostring(retry_after)
+"""
+
+class RedisRateLimiter:
+    """
+    Token buckets stored in Redis and shared by every worker.
+
+    ``client`` is any object with the asyncio Redis API used here: ``eval``,
+    ``scan_iter`` and ``unlink``. Buckets expire once they would be full again.
+    """
+
+    def __init__(self, client, prefix: str = "todoapp:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def hit(self, key: str, capacity: int, rate: float) -> float:
+        """See `MemoryRateLimiter.hit`."""
+        retry_after = await self.client.eval(TOKEN_BUCKET_SCRIPT, 1, self.prefix + key,
+                                             capacity, rate, time.time())
+        return float(retry_after)
+
+    async def clear(self):
+        """Delete every bucket under this limiter's prefix."""
+        await delete_prefix(self.client, self.prefix)
+
+def create_rate_limiter(settings=None):
+    """
+    Create the rate limiter backend selected by the `rate_limit_backend` setting.
+
+    Returns:
+        MemoryRateLimiter | RedisRateLimiter: The configured backend.
+    """
+    settings = settings or get_settings()
+    if settings.rate_limit_backend == "redis":
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("rate_limit_backend 'redis' requires the 'redis' package")
+        return RedisRateLimiter(redis.Redis.from_url(settings.cache_url))
+    return MemoryRateLimiter(settings.rate_limit_max_keys)
+
+rate_limiter = create_rate_limiter()
+
+def client_ip(request: Request) -> str:
+    """
+    Return the address of the connecting client.
+
+    Behind a reverse proxy run uvicorn with ``--proxy-headers`` so this is
+    the client's address rather than the proxy's.
+    """
+    return request.client.host if request.client else "unknown"
+
+async def enforce_rate_limit(key: str, attempts: int, window_seconds: float, limiter=None):
+    """
+    Allow ``attempts`` requests per ``window_seconds`` for ``key``, in bursts
+    of up to ``attempts``.
+
+    Raises:
+        HTTPException: 429 with a `Retry-After` header when the bucket is empty.
+    """
+    limiter = limiter or rate_limiter
+    retry_after = await limiter.hit(key, attempts, attempts / window_seconds)
+    if retry_after > 0:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail="Too many attempts, try again later",
+                            headers={"Retry-After": str(math.ceil(retry_after))})
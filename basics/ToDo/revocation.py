@@ -0,0 +1,130 @@
+import heapq
+import logging
+import queue
+import sqlite3
+import time
+from threading import Lock, Thread
+from .settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+class RevocationStore:
+    """
+    Denylist of revoked tokens and users.
+
+    Individual tokens are revoked by their ``jti`` claim and kept until they
+    would have expired anyway; revoking a user rejects every token issued to
+    them before that moment. Both checks are dictionary lookups, so calling
+    :meth:`is_revoked` on every request is cheap. Expired tokens are popped
+    from a heap ordered by expiry as new ones are revoked, so each entry is
+    dropped once and a revocation never scans the whole denylist.
+
+    When ``path`` is given, revocations are also written to a small SQLite
+    database and reloaded on startup, so they survive restarts and are seen
+    by every worker started afterwards. The writes are queued to a
+    background thread, so revoking a token never waits on the disk.
+    """
+
+    def __init__(self, path=None):
+        self._tokens = {}
+        self._expiries = []
+        self._users = {}
+        self._lock = Lock()
+        self._writes = None
+        if path:
+            connection = sqlite3.connect(path, check_same_thread=False)
+            connection.execute("CREATE TABLE IF NOT EXISTS revoked_tokens "
+                               "(jti TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires_at "
+                               "ON revoked_tokens (expires_at)")
+            connection.execute("CREATE TABLE IF NOT EXISTS revoked_users "
+                               "(user_id INTEGER PRIMARY KEY, revoked_before REAL NOT NULL)")
+            connection.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (time.time(),))
+            connection.commit()
+            self._tokens = dict(connection.execute("SELECT jti, expires_at FROM revoked_tokens"))
+            self._users = dict(connection.execute("SELECT user_id, revoked_before FROM revoked_users"))
+            self._expiries = [(expires_at, jti) for jti, expires_at in self._tokens.items()]
+            heapq.heapify(self._expiries)
+            self._writes = queue.Queue()
+            Thread(target=self._write_loop, args=(connection,), name="revocation-writer", daemon=True).start()
+
+    def revoke_token(self, jti: str, expires_at: float):
+        """
+        Revoke a single token.
+
+        Args:
+            jti (str): The token's ``jti`` claim.
+            expires_at (float): The token's ``exp`` claim; the entry is dropped after it.
+        """
+        with self._lock:
+            self._purge_expired()
+            self._tokens[jti] = expires_at
+            heapq.heappush(self._expiries, (expires_at, jti))
+            self._write("INSERT OR REPLACE INTO revoked_tokens VALUES (?, ?)", (jti, expires_at))
+
+    def revoke_user(self, user_id: int):
+        """Revoke every token issued to ``user_id`` up to now."""
+        revoked_before = time.time()
+        with self._lock:
+            self._users[user_id] = revoked_before
+            self._write("INSERT OR REPLACE INTO revoked_users VALUES (?, ?)", (user_id, revoked_before))
+
+    def is_revoked(self, jti, user_id, issued_at) -> bool:
+        """
+        Return True if a token has been revoked.
+
+        Args:
+            jti (str): The token's ``jti`` claim, if any.
+            user_id (int): The token's ``id`` claim.
+            issued_at (float): The token's ``iat`` claim, if any.
+        """
+        if jti is not None and jti in self._tokens:
+            return True
+        revoked_before = self._users.get(user_id)
+        if revoked_before is None:
+            return False
+        return issued_at is None or issued_at <= revoked_before
+
+    def _purge_expired(self):
+        now = time.time()
+        purged = False
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, jti = heapq.heappop(self._expiries)
+            # Skip heap entries left behind by a token revoked again with another expiry.
+            if self._tokens.get(jti) == expires_at:
+                del self._tokens[jti]
+                purged = True
+        if purged:
+            self._write("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+
+    def _write(self, statement, parameters=()):
+        if self._writes is not None:
+            self._writes.put((statement, parameters))
+
+    def _write_loop(self, connection):
+        while True:
+            statement, parameters = self._writes.get()
+            try:
+                connection.execute(statement, parameters)
+                # Commit once the queue is drained, so a burst of revocations shares a commit.
+                if self._writes.empty():
+                    connection.commit()
+            except sqlite3.Error:
+                logger.exception("Could not persist revocation: %s", statement)
+            finally:
+                self._writes.task_done()
+
+    def flush(self):
+        """Wait until every queued revocation has been written to disk."""
+        if self._writes is not None:
+            self._writes.join()
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._expiries.clear()
+            self._users.clear()
+            self._write("DELETE FROM revoked_tokens")
+            self._write("DELETE FROM revoked_users")
+
+revocation_store = RevocationStore(get_settings().revocation_db_path)
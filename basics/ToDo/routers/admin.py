@@ -1,45 +1,99 @@
-from typing import Annotated
+import csv
+import io
+import json
+from typing import Annotated, Literal
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import Todos
-from ..database import SessionLocal
+from ..cache import todo_cache
+from ..changes import add_tombstones
+from ..events import todo_events
+from ..database import get_db
+from ..pagination import TODO_FIELDS, TodoFieldsResponse, TodoPage
 from starlette import status
 from .auth import get_current_user
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
+from fastapi.responses import StreamingResponse
 
 router = APIRouter(
     prefix='/admin',
     tags=['admin']
 )
 
-def get_db():
-    """
-    Dependency that returns a database session.
-    
-    This dependency is used as a generator to create a new database session
-    and then close it when the generator is exhausted.
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+async def export_rows(db: AsyncSession, format: str):
     """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close
+    Stream every todo in the database as NDJSON lines or CSV rows.
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+    Rows are fetched through a server-side cursor in batches of
+    `EXPORT_BATCH_SIZE` and each batch is encoded and yielded as one chunk,
+    so memory use does not depend on the size of the table.
+
+    Args:
+    - db (AsyncSession): The database session to stream from.
+    - format (str): Either "ndjson" or "csv".
+    """
+    columns = [getattr(Todos, field) for field in TODO_FIELDS]
+    result = await db.stream(select(*columns)
+                             .order_by(Todos.id)
+                             .execution_options(yield_per=EXPORT_BATCH_SIZE))
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(TODO_FIELDS)
+        yield buffer.getvalue()
+    async for batch in result.partitions():
+        if format == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            yield buffer.getvalue()
+        else:
+            yield "".join(json.dumps(dict(zip(TODO_FIELDS, row))) + "\n" for row in batch)
 
-@router.get("/todo", status_code=status.HTTP_200_OK)
+@router.get("/todo", status_code=status.HTTP_200_OK,
+            response_model=list[TodoFieldsResponse], response_model_exclude_unset=True)
 async def read_all(user:user_dependency,
-                   db: db_dependency):
+                   db: db_dependency,
+                   response: Response,
+                   page: Annotated[TodoPage, Depends()]):
     """
-    Return all todos in the database.
+    Return a page of todos across all users.
     
-    This endpoint is only accessible to administrators.
+    This endpoint is only accessible to administrators. It takes the same
+    `cursor`, `limit`, `fields`, `complete` and `priority` query parameters
+    as `GET /` and sets `X-Next-Cursor` when more todos are available.
     """
     if user is None or user.get('role') != 'admin':
         raise HTTPException(status_code=401, 
                             detail="Unauthorized")
-    return db.query(Todos).all()
+    return await page.fetch(db, response)
+
+@router.get("/todo/export", status_code=status.HTTP_200_OK)
+async def export_todos(user: user_dependency,
+                       db: db_dependency,
+                       format: Literal["ndjson", "csv"] = Query(default="ndjson")):
+    """
+    Export all todos in the database as a streamed NDJSON or CSV document.
+    
+    This endpoint is only accessible to administrators. The response starts
+    as soon as the first batch is read and is sent in chunks, so exports of
+    any size run in constant memory.
+    """
+    if user is None or user.get('role') != 'admin':
+        raise HTTPException(status_code=401, 
+                            detail="Unauthorized")
+    return StreamingResponse(export_rows(db, format),
+                             media_type=EXPORT_MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="todos.{format}"'})
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_todo(user: user_dependency,
@@ -53,16 +107,20 @@ async def delete_todo(user: user_dependency,
     
     Args:
     - user (dict): The currently authenticated user.
-    - db (Session): The database session.
+    - db (AsyncSession): The database session.
     - todo_id (int): The id of the todo to be deleted.
     """
     
     if user is None or user.get('role') != 'admin':
         raise HTTPException(status_code=401, 
                             detail="Unauthorized")
-    todo_model = db.query(Todos).filter(Todos.id == todo_id).first()
-    
-    if todo_model is None:
-        raise HTTPException(status_code=404, detail="todo not found")
-    db.query(Todos).filter(Todos.id == todo_id).delete()
-    db.commit()
\ No newline at end of file
+    owner_id = await db.scalar(delete(Todos)
+                               .filter(Todos.id == todo_id)
+                               .returning(Todos.owner_id)
+                               .execution_options(synchronize_session=False))
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Todo not found.")
+    revision = await add_tombstones(db, owner_id, [todo_id])
+    await db.commit()
+    await todo_cache.invalidate(owner_id)
+    todo_events.publish(owner_id, "deleted", [todo_id], revision)
\ No newline at end of file
@@ -1,36 +1,39 @@
 from datetime import datetime, timedelta, timezone
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import Annotated, Optional
 from pydantic import BaseModel  
 from ..models import Users
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from ..database import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from ..events import todo_events
+from ..hashing import bcrypt_context, password_hasher
+from ..idempotency import idempotency_key_header, idempotency_store
+from ..rate_limit import client_ip, enforce_rate_limit
+from ..revocation import revocation_store
+from ..settings import get_settings
+from ..token_cache import token_cache
 from starlette import status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import jwt, JWTError
-import json
+import uuid
 
 router = APIRouter(
     prefix='/auth',
     tags=['auth']
 )
 
-def load_config(filename):
-    with open(filename, 'r') as file:
-        config = json.load(file)
-    return config
+settings = get_settings()
 
-config = load_config('ToDo/config.json')
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
 
-SECRET_KEY = config.get('SECRET_KEY')
-ALGORITHM = config.get('ALGORITHM')
+ACCESS_TOKEN_EXPIRE = timedelta(minutes=settings.access_token_expire_minutes)
+REFRESH_TOKEN_EXPIRE = timedelta(days=settings.refresh_token_expire_days)
+STREAM_TICKET_EXPIRE = timedelta(seconds=settings.event_ticket_seconds)
 
-if ALGORITHM is None:
-    raise ValueError("ALGORITHM is not set in the configuration file")
-
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
+oauth2_bearer_optional = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False)
 
 class CreateUserRequest(BaseModel):
     username: str
@@ -44,23 +47,14 @@ class CreateUserRequest(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
-    
-def get_db():
-    """
-    Dependency that returns a database session.
-    
-    This dependency is used as a generator to create a new database session
-    and then close it when the generator is exhausted.
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close
+    refresh_token: Optional[str] = None
 
-db_dependency = Annotated[Session, Depends(get_db)]
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+    
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
-def authenticate_user(username: str, 
+async def authenticate_user(username: str, 
                       password: str, 
                       db):
     """
@@ -69,19 +63,20 @@ def authenticate_user(username: str,
     Args:
         username (str): The user's username.
         password (str): The user's password.
-        db (Session): The database session to use.
+        db (AsyncSession): The database session to use.
 
     Returns:
         Users: The user's database model if authentication is successful, otherwise False.
     """
-    user = db.query(Users).filter(Users.username == username).first()
+    user = await db.scalar(select(Users).filter(Users.username == username))
     if not user:
         return False
-    if not bcrypt_context.verify(password, user.hashed_password):   
+    if not await password_hasher.verify(password, user.hashed_password):
         return False
     return user
     
-def create_access_token(username: str, user_id: int, role: str, expires_delta: timedelta):
+def create_access_token(username: str, user_id: int, role: str, expires_delta: timedelta,
+                        token_type: str = "access"):
     """
     Generate an access token for the given user.
 
@@ -90,17 +85,91 @@ def create_access_token(username: str, user_id: int, role: str, expires_delta: t
         user_id (int): The ID of the user.
         role (str): The role of the user.
         expires_delta (timedelta): The expiry time delta for the token.
+        token_type (str): "access" for bearer tokens, "refresh" for refresh tokens.
 
     Returns:
         str: The generated access token.
     """
+    issued = datetime.now(timezone.utc)
     encode = {"sub": username, 
               "id": user_id, 
-              "role": role}
-    expires = datetime.now(timezone.utc) + expires_delta
+              "role": role,
+              "type": token_type,
+              "jti": uuid.uuid4().hex,
+              "iat": issued}
+    expires = issued + expires_delta
     encode.update({"exp": expires})
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def create_refresh_token(username: str, user_id: int, role: str, expires_delta: timedelta):
+    """
+    Generate a long-lived refresh token for the given user.
+
+    Refresh tokens are only accepted by `POST /auth/refresh`, never as bearer tokens.
+
+    Returns:
+        str: The generated refresh token.
+    """
+    return create_access_token(username, user_id, role, expires_delta, token_type="refresh")
+
+def issue_tokens(username: str, user_id: int, role: str):
+    """
+    Return a new access/refresh token pair as a `Token` response body.
+    """
+    return {'access_token': create_access_token(username, user_id, role, ACCESS_TOKEN_EXPIRE),
+            'token_type': 'bearer',
+            'refresh_token': create_refresh_token(username, user_id, role, REFRESH_TOKEN_EXPIRE)}
+
+def decode_token(token: str):
+    """
+    Verify a token and return its claims.
+
+    Raises:
+        HTTPException: If the signature is invalid, the token has expired or it has been revoked.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
+                            detail="Could not validate user.")
+    if revocation_store.is_revoked(payload.get("jti"), payload.get("id"), payload.get("iat")):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
+                            detail="Could not validate user.")
+    return payload
+
+def access_token_claims(token: str):
+    """
+    Verify an access token and return its claims.
+
+    Verified claims are cached by token digest until the token expires, so repeated
+    requests with the same token skip the signature check; the revocation check runs
+    on every request.
+
+    Returns:
+        dict: The keys "username", "id", "role", "jti", "iat" and "exp".
+
+    Raises:
+        HTTPException: If the token is invalid, revoked or not an access token.
+    """
+    claims = token_cache.get(token)
+    if claims is None:
+        payload = decode_token(token)
+        claims = {"username": payload.get("sub"),
+                  "id": payload.get("id"),
+                  "role": payload.get("role"),
+                  "jti": payload.get("jti"),
+                  "iat": payload.get("iat"),
+                  "exp": payload.get("exp")}
+        if claims["username"] is None or claims["id"] is None or claims["role"] is None \
+                or payload.get("type", "access") != "access":
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
+                                detail="Could not validate user.")
+        token_cache.put(token, claims, payload.get("exp"))
+    elif revocation_store.is_revoked(claims["jti"], claims["id"], claims["iat"]):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
+                            detail="Could not validate user.")
+    return claims
+
 async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
     """
     Return the current user given the provided access token.
@@ -114,49 +183,142 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
     Raises:
         HTTPException: If the token is invalid, or if the user is not found.
     """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        user_id: int = payload.get("id")
-        user_role: str = payload.get("role")
-        if username is None or user_id is None or user_role is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
-                                detail="Could not validate credentials")
-        return {"username": username, 
-                "id": user_id, 
-                "role": user_role}
-    except JWTError:
+    claims = access_token_claims(token)
+    return {"username": claims["username"], 
+            "id": claims["id"], 
+            "role": claims["role"]}
+
+async def get_current_claims(token: Annotated[str, Depends(oauth2_bearer)]):
+    """
+    Return all verified claims of the bearer access token, for endpoints that need
+    its "jti" or expiry as well as the user.
+    """
+    return access_token_claims(token)
+
+def create_stream_ticket(claims: dict):
+    """
+    Generate a short-lived, single-use ticket for opening an event stream.
+
+    Browsers' `EventSource` cannot send an Authorization header, so the ticket is
+    passed in the URL instead of the access token; a ticket that shows up in access
+    logs has long expired. It carries the access token's "jti", "iat" and expiry, so
+    the stream is checked against and ends with that token.
+
+    Args:
+        claims (dict): The verified claims of the access token, see `access_token_claims`.
+
+    Returns:
+        str: The signed ticket.
+    """
+    issued = datetime.now(timezone.utc)
+    expires = min(issued + STREAM_TICKET_EXPIRE, datetime.fromtimestamp(claims["exp"], timezone.utc))
+    encode = {"sub": claims["username"],
+              "id": claims["id"],
+              "role": claims["role"],
+              "type": "stream",
+              "jti": uuid.uuid4().hex,
+              "iat": issued,
+              "exp": expires,
+              "token_jti": claims["jti"],
+              "token_iat": claims["iat"],
+              "token_exp": claims["exp"]}
+    return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+
+async def get_stream_user(header_token: Annotated[Optional[str], Depends(oauth2_bearer_optional)],
+                          ticket: Optional[str] = Query(default=None)):
+    """
+    Return the claims of the access token an event stream is opened with.
+
+    Clients that can send an Authorization header use their access token; browsers
+    pass a ticket from `POST /todo/events/ticket` as the `ticket` query parameter
+    instead. A ticket is revoked when it is redeemed, so it opens one stream only.
+
+    Returns:
+        dict: The keys "username", "id", "role", "jti", "iat" and "exp" of the access token.
+
+    Raises:
+        HTTPException: If no credentials are given, or they are invalid, expired or revoked.
+    """
+    if header_token is not None:
+        return access_token_claims(header_token)
+    if ticket is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Not authenticated")
+    payload = decode_token(ticket)
+    if payload.get("type") != "stream" \
+            or revocation_store.is_revoked(payload["token_jti"], payload["id"], payload["token_iat"]):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
-                            detail="Could not validate credentials")
-        
-@router.post("/", status_code=status.HTTP_201_CREATED)
+                            detail="Could not validate user.")
+    revocation_store.revoke_token(payload["jti"], payload["exp"])
+    return {"username": payload["sub"],
+            "id": payload["id"],
+            "role": payload["role"],
+            "jti": payload["token_jti"],
+            "iat": payload["token_iat"],
+            "exp": payload["token_exp"]}
+
+async def login_rate_limit(request: Request,
+                           form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
+    """
+    Throttle login attempts per client IP and per username.
+
+    Runs before the password is verified, so a burst of guesses is rejected
+    with a 429 instead of costing a bcrypt verification each.
+    """
+    await enforce_rate_limit(f"login:ip:{client_ip(request)}",
+                             settings.login_attempts_per_ip, settings.rate_limit_window_seconds)
+    await enforce_rate_limit(f"login:user:{form_data.username.lower()}",
+                             settings.login_attempts_per_username, settings.rate_limit_window_seconds)
+
+async def signup_rate_limit(request: Request):
+    """
+    Throttle account creation per client IP.
+    """
+    await enforce_rate_limit(f"signup:ip:{client_ip(request)}",
+                             settings.signup_attempts_per_ip, settings.rate_limit_window_seconds)
+
+@router.post("/", status_code=status.HTTP_201_CREATED, dependencies=[Depends(signup_rate_limit)])
 async def create_user(db: db_dependency, 
-                      create_user_request: CreateUserRequest):
+                      create_user_request: CreateUserRequest,
+                      idempotency_key: idempotency_key_header = None):
     """
     Create a new user.
 
+    A retry carrying the same `Idempotency-Key` header gets the original response back
+    without hashing the password or writing the user again.
+
     Args:
-        db (Session): The database session to use.
+        db (AsyncSession): The database session to use.
         create_user_request (CreateUserRequest): The user's details to create.
+        idempotency_key (str): The optional `Idempotency-Key` request header.
 
     Returns:
         None
     """
-    create_user_model = Users(
-        username=create_user_request.username,
-        first_name=create_user_request.first_name,
-        last_name=create_user_request.last_name,
-        email=create_user_request.email,
-        hashed_password=bcrypt_context.hash(create_user_request.hashed_password),
-        role=create_user_request.role,
-        is_active=True,
-        phone_number = create_user_request.phone_number
-    )
-    
-    db.add(create_user_model)
-    db.commit()
+    payload = create_user_request.model_dump()
+    replay = await idempotency_store.start("signup", idempotency_key, payload)
+    if replay is not None:
+        return replay
+    try:
+        create_user_model = Users(
+            username=create_user_request.username,
+            first_name=create_user_request.first_name,
+            last_name=create_user_request.last_name,
+            email=create_user_request.email,
+            hashed_password=await password_hasher.hash(create_user_request.hashed_password),
+            role=create_user_request.role,
+            is_active=True,
+            phone_number = create_user_request.phone_number
+        )
+
+        db.add(create_user_model)
+        await db.commit()
+    except BaseException:
+        await idempotency_store.abort("signup", idempotency_key)
+        raise
+    await idempotency_store.finish("signup", idempotency_key, payload, status.HTTP_201_CREATED, None)
     
-@router.post("/token", response_model=Token)
+@router.post("/token", response_model=Token, dependencies=[Depends(login_rate_limit)])
 async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
                                  db: db_dependency):
     """
@@ -164,22 +326,64 @@ async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm,
 
     Args:
         form_data (OAuth2PasswordRequestForm, Depends): The form data containing the username and password.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Returns:
-        dict: The access token details, including the token and token type.
+        dict: The access token details, including the token, token type and refresh token.
 
     Raises:
         HTTPException: If the username or password is incorrect.
     """
-    user = authenticate_user(form_data.username, 
-                             form_data.password, 
-                             db)
+    user = await authenticate_user(form_data.username, 
+                                   form_data.password, 
+                                   db)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Incorrect username or password")   
-    token = create_access_token(user.username, 
-                                user.id, 
-                                user.role, 
-                                timedelta(minutes=20))    
-    return {'access_token': token, 'token_type': 'bearer'}
+    return issue_tokens(user.username, user.id, user.role)
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(refresh_request: RefreshTokenRequest):
+    """
+    Exchange a refresh token for a new access/refresh token pair.
+
+    The presented refresh token is revoked (rotation), so each one can be used once.
+    No password check or database query is needed.
+
+    Args:
+        refresh_request (RefreshTokenRequest): The body containing the refresh token.
+
+    Returns:
+        dict: The new access token details, including the new refresh token.
+
+    Raises:
+        HTTPException: If the refresh token is invalid, expired or revoked.
+    """
+    payload = decode_token(refresh_request.refresh_token)
+    if payload.get("type") != "refresh":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
+                            detail="Could not validate user.")
+    revocation_store.revoke_token(payload["jti"], payload["exp"])
+    return issue_tokens(payload["sub"], payload["id"], payload["role"])
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token: Annotated[str, Depends(oauth2_bearer)],
+                 refresh_request: Optional[RefreshTokenRequest] = None):
+    """
+    Revoke the bearer access token and, if given, the refresh token.
+
+    Event streams opened with the access token are closed.
+
+    Args:
+        token (str): The access token from the Authorization header.
+        refresh_request (RefreshTokenRequest): Optional body containing the refresh token.
+
+    Raises:
+        HTTPException: If the access token is invalid.
+    """
+    tokens = [token] if refresh_request is None else [token, refresh_request.refresh_token]
+    for payload in [decode_token(value) for value in tokens]:
+        if payload.get("jti") is not None:
+            revocation_store.revoke_token(payload["jti"], payload["exp"])
+            todo_events.close(payload["id"], payload["jti"])
+    token_cache.invalidate(token)
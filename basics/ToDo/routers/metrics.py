@@ -0,0 +1,57 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette import status
+from ..database import pool_metrics
+from ..instrumentation import app_metrics, render_metric
+from ..token_cache import token_cache
+
+router = APIRouter(
+    prefix='/metrics',
+    tags=['metrics']
+)
+
+# Pool snapshot keys exported by the Prometheus endpoint; the rest are gauges.
+POOL_COUNTERS = {"connects", "checkouts", "checkins", "invalidations", "wait_count", "wait_seconds_total"}
+POOL_GAUGES = {"size", "checked_out", "idle", "overflow", "max_overflow", "wait_seconds_max"}
+
+def pool_metric_lines(snapshot):
+    lines = []
+    for key in sorted(POOL_COUNTERS | POOL_GAUGES):
+        if key not in snapshot:
+            continue
+        if key in POOL_COUNTERS:
+            name = f"db_pool_{key}" if key.endswith("_total") else f"db_pool_{key}_total"
+            lines += render_metric(name, "counter", f"Connection pool {key.replace('_', ' ')}.", snapshot[key])
+        else:
+            lines += render_metric(f"db_pool_{key}", "gauge", f"Connection pool {key.replace('_', ' ')}.", snapshot[key])
+    return lines
+
+@router.get("", response_class=PlainTextResponse)
+async def read_prometheus_metrics():
+    """
+    Return request, database and pool metrics in the Prometheus text format.
+
+    Includes per-route latency histograms, the number of SQL statements and
+    the time spent in them per request, the slow-query count and the
+    connection pool counters.
+    """
+    lines = app_metrics.render() + pool_metric_lines(pool_metrics.snapshot())
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@router.get("/pool", status_code=status.HTTP_200_OK)
+async def read_pool_metrics():
+    """
+    Return the state of the database connection pool.
+
+    Reports pool size, checked-out and idle connections, overflow usage and
+    how long sessions have waited for a connection, for sizing the pool
+    against the number of workers.
+    """
+    return pool_metrics.snapshot()
+
+@router.get("/token-cache", status_code=status.HTTP_200_OK)
+async def read_token_cache_metrics():
+    """
+    Return the size and hit/miss counters of the verified-token cache.
+    """
+    return token_cache.stats()
@@ -1,69 +1,403 @@
-from typing import Annotated
-from fastapi import Depends, APIRouter, HTTPException, Path
-from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Annotated, Optional
+from fastapi import Body, Depends, APIRouter, Header, HTTPException, Path, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import Todos
-from ..database import SessionLocal
-from .auth import get_current_user
+from ..cache import etag_matches, todo_cache
+from ..changes import add_tombstones, allocate_revisions, changes_since
+from ..events import event_stream, todo_events
+from ..idempotency import idempotency_key_header, idempotency_store
+from ..settings import get_settings
+from ..database import get_db
+from ..pagination import MAX_PAGE_SIZE, TodoFieldsResponse, TodoPage
+from ..search import search_statement, search_terms
+from .auth import create_stream_ticket, get_current_claims, get_current_user, get_stream_user
 from starlette import status
 
 router = APIRouter()
 
-def get_db():
-    """
-    Dependency that returns a database session.
-
-    This dependency is used as a generator to create a new database session
-    and then close it when the generator is exhausted.
-    """
-    
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
+if_none_match_header = Annotated[Optional[str], Header()]
+if_match_header = Annotated[Optional[str], Header()]
 
 class TodoRequest(BaseModel):
     title: str = Field(min_length=3)
     description: str=Field(min_length=3, max_length=100)
     priority: int=Field(gt=0, lt=6)
     complete: bool 
+
+class TodoResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    description: str
+    priority: int
+    complete: bool
+    owner_id: int
+
+class TodoPatchRequest(BaseModel):
+    title: Optional[str] = Field(default=None, min_length=3)
+    description: Optional[str] = Field(default=None, min_length=3, max_length=100)
+    priority: Optional[int] = Field(default=None, gt=0, lt=6)
+    complete: Optional[bool] = None
+
+class TodoChangeResponse(TodoResponse):
+    revision: int
+    version: int
+    updated_at: Optional[datetime]
+
+class TodoChangesResponse(BaseModel):
+    revision: int
+    has_more: bool
+    todos: list[TodoChangeResponse]
+    deleted: list[int]
+
+class TodoBatchUpdateRequest(TodoRequest):
+    id: int = Field(gt=0)
+
+MAX_BATCH_SIZE = 500
+
+batch_create_body = Annotated[list[TodoRequest], Body(min_length=1, max_length=MAX_BATCH_SIZE)]
+batch_update_body = Annotated[list[TodoBatchUpdateRequest], Body(min_length=1, max_length=MAX_BATCH_SIZE)]
+batch_delete_body = Annotated[list[Annotated[int, Field(gt=0)]], Body(min_length=1, max_length=MAX_BATCH_SIZE)]
+
+def cached_response(entry: dict, response: Response, if_none_match: Optional[str]):
+    """
+    Turn a cached todo entry into a response.
+
+    Returns a bodiless 304 when `If-None-Match` matches the entry's ETag, otherwise
+    sets the `ETag` (and `X-Next-Cursor` for pages) headers and returns the body.
+    """
+    if etag_matches(if_none_match, entry["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": entry["etag"]})
+    response.headers["ETag"] = entry["etag"]
+    if entry.get("next_cursor") is not None:
+        response.headers["X-Next-Cursor"] = str(entry["next_cursor"])
+    return entry["body"]
+
+def todo_etag(id: int, revision: int) -> str:
+    """
+    Return the strong ETag of a todo at the given revision.
+
+    Revisions are allocated per owner and every write takes a new one, so with the id
+    the tag is unique across all of a user's todos and their states.
+    """
+    return f'"{id}-{revision}"'
+
+def parse_if_match(if_match: Optional[str], id: int):
+    """
+    Return the revisions of todo `id` an `If-Match` header accepts, or None for any.
+
+    Weak and malformed entity tags, and tags of other todos, never match, as `If-Match`
+    uses strong comparison.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    revisions = []
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if len(tag) > 2 and tag[0] == tag[-1] == '"':
+            tag_id, _, revision = tag[1:-1].partition("-")
+            if tag_id == str(id) and revision.isdigit():
+                revisions.append(int(revision))
+    return revisions
+
+async def update_todo_if_match(db: AsyncSession, owner_id: int, id: int, values: dict, if_match: Optional[str]):
+    """
+    Apply `values` to one of a user's todos in a single conditional UPDATE.
+
+    The todo gets a new revision and version, and when `If-Match` names revisions the
+    UPDATE only matches while the todo is still at one of them, so a concurrent edit is
+    detected without holding any lock.
+
+    Returns:
+    - int: The revision written.
+
+    Raises:
+    - HTTPException: 404 if the todo is not found for the user, 412 if it has been
+      modified since the revision in `If-Match`.
+    """
+    revisions = parse_if_match(if_match, id)
+    revision = await allocate_revisions(db, owner_id)
+    stmt = (update(Todos)
+            .filter(Todos.id == id)
+            .filter(Todos.owner_id == owner_id)
+            .values(**values, revision=revision, version=Todos.version + 1)
+            .returning(Todos.id)
+            .execution_options(synchronize_session=False))
+    if revisions is not None:
+        stmt = stmt.filter(Todos.revision.in_(revisions))
+    if await db.scalar(stmt) is None:
+        current = await db.scalar(select(Todos.revision).filter(Todos.id == id).filter(Todos.owner_id == owner_id))
+        if current is None:
+            raise HTTPException(status_code=404, detail="Todo not found.")
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED,
+                            detail="Todo was modified by another request.",
+                            headers={"ETag": todo_etag(id, current)})
+    return revision
     
-@router.get("/", status_code = status.HTTP_200_OK)
+@router.get("/", status_code = status.HTTP_200_OK,
+            response_model=list[TodoFieldsResponse], response_model_exclude_unset=True)
 async def read_all(user: user_dependency, 
-                   db: db_dependency):
+                   db: db_dependency,
+                   response: Response,
+                   page: Annotated[TodoPage, Depends()],
+                   if_none_match: if_none_match_header = None):
     """
-    Return all todos for the current user.
+    Return a page of todos for the current user.
 
     This endpoint is protected by the same authentication as the other endpoints in this router.
+    Todos are returned in id order; when more are available the `X-Next-Cursor` response
+    header holds the value to pass as `cursor` for the next page. Pages are served from the
+    todo cache until the user's todos change, and a matching `If-None-Match` gets a 304.
+
+    Args:
+    - user (dict): The currently authenticated user, passed in via the `user_dependency`.
+    - db (AsyncSession): The database session to use, passed in via the `db_dependency`.
+    - response (Response): The response, used to set the `ETag` and `X-Next-Cursor` headers.
+    - page (TodoPage): The `cursor`, `limit`, `fields`, `complete` and `priority` query parameters.
+    - if_none_match (str): The `If-None-Match` request header.
+
+    Returns:
+    - List[dict]: A page of the current user's todos, limited to the requested fields.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    key, entry = await todo_cache.get(user.get("id"), f"page:{page.cache_key()}")
+    if entry is None:
+        rows, next_cursor = await page.fetch_page(db, Todos.owner_id == user.get("id"))
+        entry = await todo_cache.set(key, rows, next_cursor=next_cursor)
+    return cached_response(entry, response, if_none_match)
+
+@router.post("/todo/batch", status_code=status.HTTP_201_CREATED, response_model=list[TodoResponse])
+async def create_todos(user: user_dependency,
+                       db: db_dependency,
+                       todoRequests: batch_create_body):
+    """
+    Create several todos in one transaction.
+
+    All rows are written by a single multi-row INSERT ... RETURNING statement.
+
+    Args:
+    - user (dict): The currently authenticated user, passed in via the `user_dependency`.
+    - db (AsyncSession): The database session to use, passed in via the `db_dependency`.
+    - todoRequests (List[TodoRequest]): The todos to create, at most `MAX_BATCH_SIZE`.
+
+    Returns:
+    - List[Todos]: The created todos, in request order.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    first_revision = await allocate_revisions(db, user.get("id"), len(todoRequests))
+    rows = [{**todoRequest.model_dump(), "owner_id": user.get("id"), "revision": first_revision + offset}
+            for offset, todoRequest in enumerate(todoRequests)]
+    result = await db.scalars(insert(Todos).returning(Todos, sort_by_parameter_order=True), rows)
+    todo_models = result.all()
+    await db.commit()
+    await todo_cache.invalidate(user.get("id"))
+    todo_events.publish(user.get("id"), "created", [todo.id for todo in todo_models],
+                        first_revision + len(todo_models) - 1)
+    return todo_models
+
+@router.patch("/todo/batch", status_code=status.HTTP_204_NO_CONTENT)
+async def update_todos(user: user_dependency,
+                       db: db_dependency,
+                       todoRequests: batch_update_body):
+    """
+    Update several todos in one transaction.
+
+    All rows are updated with a single executemany UPDATE keyed on the primary key
+    and the owner, so a todo deleted or handed to another user concurrently is never
+    written; nothing is updated unless every id matched.
+
+    Args:
+    - user (dict): The currently authenticated user, passed in via the `user_dependency`.
+    - db (AsyncSession): The database session to use, passed in via the `db_dependency`.
+    - todoRequests (List[TodoBatchUpdateRequest]): The todos to update, each with its `id`.
+
+    Raises:
+    - HTTPException: If an id is repeated or any todo is not found for the current user.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    ids = {todoRequest.id for todoRequest in todoRequests}
+    if len(ids) != len(todoRequests):
+        raise HTTPException(status_code=400, detail="Duplicate todo ids")
+    first_revision = await allocate_revisions(db, user.get("id"), len(todoRequests))
+    # A Core executemany, so each row's version is bumped in SQL rather than overwritten.
+    todos = Todos.__table__
+    result = await db.execute(update(todos)
+                              .where(todos.c.id == bindparam("todo_id"))
+                              .where(todos.c.owner_id == user.get("id"))
+                              .values(title=bindparam("title"), description=bindparam("description"),
+                                      priority=bindparam("priority"), complete=bindparam("complete"),
+                                      revision=bindparam("todo_revision"), version=todos.c.version + 1),
+                              [{**todoRequest.model_dump(exclude={"id"}), "todo_id": todoRequest.id,
+                                "todo_revision": first_revision + offset}
+                               for offset, todoRequest in enumerate(todoRequests)])
+    if result.rowcount != len(todoRequests):
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Todo not found.")
+    await db.commit()
+    await todo_cache.invalidate(user.get("id"))
+    todo_events.publish(user.get("id"), "updated", [todoRequest.id for todoRequest in todoRequests],
+                        first_revision + len(todoRequests) - 1)
+
+@router.delete("/todo/batch", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_todos(user: user_dependency,
+                       db: db_dependency,
+                       ids: batch_delete_body):
+    """
+    Delete several todos in one statement.
+
+    Nothing is deleted unless every id belongs to the current user.
 
     Args:
     - user (dict): The currently authenticated user, passed in via the `user_dependency`.
-    - db (Session): The database session to use, passed in via the `db_dependency`.
+    - db (AsyncSession): The database session to use, passed in via the `db_dependency`.
+    - ids (List[int]): The ids of the todos to delete.
+
+    Raises:
+    - HTTPException: If any todo is not found for the current user.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    result = await db.scalars(delete(Todos)
+                              .filter(Todos.id.in_(ids))
+                              .filter(Todos.owner_id == user.get("id"))
+                              .returning(Todos.id)
+                              .execution_options(synchronize_session=False))
+    deleted_ids = result.all()
+    if len(deleted_ids) != len(set(ids)):
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Todo not found.")
+    revision = await add_tombstones(db, user.get("id"), deleted_ids)
+    await db.commit()
+    await todo_cache.invalidate(user.get("id"))
+    todo_events.publish(user.get("id"), "deleted", deleted_ids, revision)
+
+@router.get("/todo/search", status_code=status.HTTP_200_OK, response_model=list[TodoResponse])
+async def search_todos(user: user_dependency,
+                       db: db_dependency,
+                       q: str = Query(min_length=1, max_length=200),
+                       limit: int = Query(default=20, gt=0, le=MAX_PAGE_SIZE)):
+    """
+    Search the current user's todos by title and description.
+
+    Uses the database's full-text index (FTS5 on SQLite, a tsvector GIN index on PostgreSQL),
+    best match first. Every word must match; the last one also matches as a prefix.
+
+    Args:
+    - user (dict): The currently authenticated user, passed in via the `user_dependency`.
+    - db (AsyncSession): The database session to use, passed in via the `db_dependency`.
+    - q (str): The search text.
+    - limit (int): The maximum number of todos to return.
 
     Returns:
-    - List[Todos]: A list of all todos for the current user.
+    - List[Todos]: The matching todos.
     """
     if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    return db.query(Todos).filter(Todos.owner_id == user.get("id")).all()
+    if not search_terms(q):
+        return []
+    result = await db.scalars(search_statement(db.bind.dialect.name, user.get("id"), q, limit))
+    return result.all()
+
+@router.get("/todo/changes", status_code=status.HTTP_200_OK, response_model=TodoChangesResponse)
+async def read_todo_changes(user: user_dependency,
+                            db: db_dependency,
+                            since: int = Query(default=0, ge=0),
+                            limit: int = Query(default=100, gt=0, le=MAX_PAGE_SIZE)):
+    """
+    Return the current user's todo changes after a given revision.
+
+    Every write gives the rows it touches a new, increasing revision and deletes leave
+    tombstones, so a client only downloads what changed since it last synced. Start with
+    `since=0` and pass the returned `revision` as the next `since`; repeat while `has_more`.
+
+    Args:
+    - user (dict): The currently authenticated user, passed in via the `user_dependency`.
+    - db (AsyncSession): The database session to use, passed in via the `db_dependency`.
+    - since (int): The last revision the client has applied.
+    - limit (int): The maximum number of changes to return.
+
+    Returns:
+    - dict: The changed todos, the ids of deleted todos (apply these first), the revision to
+      resume from and whether more changes are pending.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return await changes_since(db, user.get("id"), since, limit)
+
+@router.post("/todo/events/ticket", status_code=status.HTTP_200_OK)
+async def create_event_ticket(claims: Annotated[dict, Depends(get_current_claims)]):
+    """
+    Return a ticket for opening `GET /todo/events` from a browser's `EventSource`.
+
+    The ticket is used instead of the access token in the stream URL, so the token
+    never appears in access logs. It opens a single stream within `expires_in` seconds.
 
-@router.get("/todo/{id}", status_code=status.HTTP_200_OK)
+    Args:
+    - claims (dict): The claims of the bearer access token.
+
+    Returns:
+    - dict: The "ticket" and its lifetime in seconds as "expires_in".
+    """
+    return {"ticket": create_stream_ticket(claims),
+            "expires_in": get_settings().event_ticket_seconds}
+
+@router.get("/todo/events", status_code=status.HTTP_200_OK, response_class=StreamingResponse)
+async def stream_todo_events(user: Annotated[dict, Depends(get_stream_user)]):
+    """
+    Stream the current user's todo changes as Server-Sent Events.
+
+    Authenticate with the usual bearer token or, for `EventSource`, a `ticket` query
+    parameter from `POST /todo/events/ticket`. Each `created`, `updated` or `deleted` event
+    carries the changed ids and the revision written. A `resync` event means events were
+    dropped because the client fell behind; catch up with `GET /todo/changes` from the last
+    revision seen.
+
+    The stream ends when the access token expires or is revoked; reconnect with fresh
+    credentials and catch up from the last revision seen.
+
+    Args:
+    - user (dict): The claims of the access token the stream is opened with.
+
+    Returns:
+    - StreamingResponse: A `text/event-stream` that stays open until the token expires,
+      is revoked or the client disconnects.
+    """
+    subscription = todo_events.subscribe(user.get("id"), user.get("jti"))
+    return StreamingResponse(event_stream(todo_events, subscription, get_settings().event_keepalive_seconds,
+                                          expires_at=user.get("exp")),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/todo/{id}", status_code=status.HTTP_200_OK, response_model=TodoResponse)
 async def read_todo(user: user_dependency,
                     db: db_dependency, 
-                    id: int = Path(gt=0)):
+                    response: Response,
+                    id: int = Path(gt=0),
+                    if_none_match: if_none_match_header = None):
     """
     Return a single todo given the id.
 
     This endpoint is protected by the same authentication as the other endpoints in this router.
+    The todo is served from the todo cache until the user's todos change, and a matching
+    `If-None-Match` gets a 304. The `ETag` names the todo's id and revision; send it back as `If-Match`
+    on `PUT`/`PATCH` to detect concurrent edits.
 
     Args:
     - user (dict): The currently authenticated user, passed in via the `user_dependency`.
-    - db (Session): The database session to use, passed in via the `db_dependency`.
+    - db (AsyncSession): The database session to use, passed in via the `db_dependency`.
+    - response (Response): The response, used to set the `ETag` header.
     - id (int): The id of the todo to retrieve, passed in via the path parameter.
+    - if_none_match (str): The `If-None-Match` request header.
 
     Returns:
     - Todos: The todo object for the given id, or a 404 if not found.
@@ -71,46 +405,71 @@ async def read_todo(user: user_dependency,
     
     if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    todo_model = db.query(Todos).filter(Todos.id == id).filter(Todos.owner_id == user.get("id")).first()
-    if not todo_model:
-        raise HTTPException(status_code=404, detail="todo not found")
-    return todo_model
+    key, entry = await todo_cache.get(user.get("id"), f"todo:{id}")
+    if entry is None:
+        todo_model = await db.scalar(select(Todos).filter(Todos.id == id).filter(Todos.owner_id == user.get("id")))
+        if not todo_model:
+            raise HTTPException(status_code=404, detail="Todo not found.")
+        entry = await todo_cache.set(key, TodoResponse.model_validate(todo_model).model_dump(),
+                                     etag=todo_etag(todo_model.id, todo_model.revision))
+    return cached_response(entry, response, if_none_match)
 
 
-@router.post("/todo", status_code=status.HTTP_201_CREATED)
+@router.post("/todo", status_code=status.HTTP_201_CREATED, response_model=TodoResponse)
 async def create_todo(user: user_dependency, 
                       db: db_dependency, 
-                      todoRequest: TodoRequest):
+                      todoRequest: TodoRequest,
+                      idempotency_key: idempotency_key_header = None):
     """
     Create a new todo.
 
     This endpoint is protected by the same authentication as the other endpoints in this router.
+    A retry carrying the same `Idempotency-Key` header gets the original response back
+    instead of creating a second todo.
 
     Args:
     - user (dict): The currently authenticated user, passed in via the `user_dependency`.
-    - db (Session): The database session to use, passed in via the `db_dependency`.
+    - db (AsyncSession): The database session to use, passed in via the `db_dependency`.
     - todoRequest (TodoRequest): The request body containing the details of the new todo.
+    - idempotency_key (str): The optional `Idempotency-Key` request header.
 
     Returns:
     - Todos: The newly created todo object.
 
     Raises:
-    - HTTPException: If the user is not authenticated.
+    - HTTPException: If the user is not authenticated, or the idempotency key is in use
+      or was used with a different body.
     """
     if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    todo_model = Todos(**todoRequest.dict(), owner_id=user.get("id"))
-    db.add(todo_model)
-    db.commit()
-    db.refresh(todo_model)
-    return todo_model
+    idempotency_scope = f"todo:{user.get('id')}"
+    payload = todoRequest.model_dump()
+    replay = await idempotency_store.start(idempotency_scope, idempotency_key, payload)
+    if replay is not None:
+        return replay
+    try:
+        revision = await allocate_revisions(db, user.get("id"))
+        todo_model = Todos(**payload, owner_id=user.get("id"), revision=revision)
+        db.add(todo_model)
+        await db.commit()
+        await db.refresh(todo_model)
+    except BaseException:
+        await idempotency_store.abort(idempotency_scope, idempotency_key)
+        raise
+    body = TodoResponse.model_validate(todo_model).model_dump()
+    await idempotency_store.finish(idempotency_scope, idempotency_key, payload, status.HTTP_201_CREATED, body)
+    await todo_cache.invalidate(user.get("id"))
+    todo_events.publish(user.get("id"), "created", [todo_model.id], todo_model.revision)
+    return body
 
     
 @router.put("/todo/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def update_todo(user: user_dependency,
                       db: db_dependency, 
+                      response: Response,
                       todoRequest: TodoRequest, 
-                      id: int=Path(gt=0)):
+                      id: int=Path(gt=0),
+                      if_match: if_match_header = None):
     """
     Update a todo with the provided details.
 
@@ -118,30 +477,63 @@ async def update_todo(user: user_dependency,
 
     Args:
     - user (dict): The currently authenticated user, passed in via the `user_dependency`.
-    - db (Session): The database session to use, passed in via the `db_dependency`.
+    - db (AsyncSession): The database session to use, passed in via the `db_dependency`.
+    - response (Response): The response, used to set the new `ETag`.
     - todoRequest (TodoRequest): The request body containing the details to update the todo.
     - id (int): The id of the todo to update, passed in via the path parameter.
+    - if_match (str): The optional `If-Match` request header holding the `ETag` last read.
 
-    Returns:
-    - Todos: The updated todo object.
+    The ownership check, the `If-Match` check and the write are one conditional UPDATE; a
+    todo that does not exist, belongs to another user or has changed matches no rows.
 
     Raises:
-    - HTTPException: If the user is not authenticated or if the todo is not found.
+    - HTTPException: If the user is not authenticated, if the todo is not found or if
+      `If-Match` no longer matches (412).
     """
     
     if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    todo_model = db.query(Todos).filter(Todos.id == id).filter(Todos.owner_id == user.get("id")).first()
-    if not todo_model:
-        raise HTTPException(status_code=404, detail="todo not found")
-    todo_model.title = todoRequest.title
-    todo_model.description = todoRequest.description
-    todo_model.priority = todoRequest.priority
-    todo_model.complete = todoRequest.complete
-    db.add(todo_model)
-    db.commit()
-    db.refresh(todo_model)
-    return todo_model
+    revision = await update_todo_if_match(db, user.get("id"), id, todoRequest.model_dump(), if_match)
+    await db.commit()
+    await todo_cache.invalidate(user.get("id"))
+    todo_events.publish(user.get("id"), "updated", [id], revision)
+    response.headers["ETag"] = todo_etag(id, revision)
+
+@router.patch("/todo/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def patch_todo(user: user_dependency,
+                     db: db_dependency,
+                     response: Response,
+                     todoRequest: TodoPatchRequest,
+                     id: int = Path(gt=0),
+                     if_match: if_match_header = None):
+    """
+    Update only the given fields of a todo.
+
+    Works like `PUT /todo/{id}`, including the `If-Match` check, but the body holds just
+    the fields that changed.
+
+    Args:
+    - user (dict): The currently authenticated user, passed in via the `user_dependency`.
+    - db (AsyncSession): The database session to use, passed in via the `db_dependency`.
+    - response (Response): The response, used to set the new `ETag`.
+    - todoRequest (TodoPatchRequest): The fields to change.
+    - id (int): The id of the todo to update, passed in via the path parameter.
+    - if_match (str): The optional `If-Match` request header holding the `ETag` last read.
+
+    Raises:
+    - HTTPException: If the user is not authenticated, no field is given, the todo is not
+      found or `If-Match` no longer matches (412).
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    values = todoRequest.model_dump(exclude_unset=True)
+    if not values or None in values.values():
+        raise HTTPException(status_code=400, detail="Give at least one field, none of them null")
+    revision = await update_todo_if_match(db, user.get("id"), id, values, if_match)
+    await db.commit()
+    await todo_cache.invalidate(user.get("id"))
+    todo_events.publish(user.get("id"), "updated", [id], revision)
+    response.headers["ETag"] = todo_etag(id, revision)
 
 @router.delete("/todo/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_todo(user: user_dependency, 
@@ -154,21 +546,24 @@ async def delete_todo(user: user_dependency,
 
     Args:
     - user (dict): The currently authenticated user, passed in via the `user_dependency`.
-    - db (Session): The database session to use, passed in via the `db_dependency`.
+    - db (AsyncSession): The database session to use, passed in via the `db_dependency`.
     - id (int): The id of the todo to delete, passed in via the path parameter.
 
-    Returns:
-    - Todos: The deleted todo object.
+    The ownership check and the delete are one conditional DELETE; a todo that does not
+    exist or belongs to another user matches no rows.
 
     Raises:
     - HTTPException: If the user is not authenticated or if the todo is not found.
     """
     if user is None:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    todo_model = db.query(Todos).filter(Todos.id == id).filter(Todos.owner_id == user.get("id")).first()
-    if not todo_model:
-        raise HTTPException(status_code=404, detail="todo not found")
-    db.query(Todos).filter(Todos.id == id).delete()
-    db.commit()
-    db.refresh(todo_model)
-    return todo_model
+    result = await db.execute(delete(Todos)
+                              .filter(Todos.id == id)
+                              .filter(Todos.owner_id == user.get("id"))
+                              .execution_options(synchronize_session=False))
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Todo not found.")
+    revision = await add_tombstones(db, user.get("id"), [id])
+    await db.commit()
+    await todo_cache.invalidate(user.get("id"))
+    todo_events.publish(user.get("id"), "deleted", [id], revision)
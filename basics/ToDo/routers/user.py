@@ -1,41 +1,44 @@
-from typing import Annotated
+from typing import Annotated, Optional
 from fastapi import APIRouter, Depends, HTTPException, Path
-from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import Users
-from ..database import SessionLocal
+from ..database import get_db
+from ..events import todo_events
+from ..hashing import password_hasher
+from ..rate_limit import enforce_rate_limit
+from ..revocation import revocation_store
+from ..settings import get_settings
+from ..token_cache import token_cache
 from starlette import status
 from .auth import get_current_user
-from passlib.context import CryptContext
 
 router = APIRouter(
     prefix='/user',
     tags=['user']
 )
 
-def get_db():
-    """
-    Dependency that returns a database session.
-
-    This dependency is used as a generator to create a new database session
-    and then close it when the generator is exhausted.
-    """
-    
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     
+class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    role: str
+    is_active: bool
+    phone_number: Optional[str] = None
+
 class UserVerification(BaseModel):
     password: str
     new_password: str = Field(min_length=8)
     
-@router.get("/", status_code=status.HTTP_200_OK)
+@router.get("/", status_code=status.HTTP_200_OK, response_model=UserResponse)
 async def get_user(user: user_dependency,
                    db: db_dependency):
     
@@ -44,29 +47,45 @@ async def get_user(user: user_dependency,
 
     Args:
         user (dict): The currently authenticated user, passed in via the `user_dependency`.
-        db (Session): The database session to use, passed in via the `db_dependency`.
+        db (AsyncSession): The database session to use, passed in via the `db_dependency`.
 
     Returns:
-        Users: The user's database model, or a 401 if authentication failed.
+        UserResponse: The user's details without the password hash, or a 401 if authentication failed.
 
     Raises:
-        HTTPException: If authentication failed.
+        HTTPException: If authentication failed or the user no longer exists.
     """
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
-    return db.query(Users).filter(Users.id == user.get("id")).first()
+    user_model = await db.scalar(select(Users).filter(Users.id == user.get("id")))
+    if user_model is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_model
 
 
-@router.put("/password", status_code=status.HTTP_204_NO_CONTENT)
+async def password_change_rate_limit(user: user_dependency):
+    """
+    Throttle password changes per user, before the old password is verified.
+    """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication failed")
+    settings = get_settings()
+    await enforce_rate_limit(f"password:user:{user.get('id')}",
+                             settings.password_change_attempts_per_user, settings.rate_limit_window_seconds)
+
+@router.put("/password", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(password_change_rate_limit)])
 async def change_password(user: user_dependency,
                           db: db_dependency,
                           user_verification: UserVerification):
     """
     Change the user's password given the provided access token and verification details.
 
+    Every access and refresh token issued before the change is revoked and the user's
+    event streams are closed, so the client has to log in again with the new password.
+
     Args:
         user (dict): The currently authenticated user, passed in via the `user_dependency`.
-        db (Session): The database session to use, passed in via the `db_dependency`.
+        db (AsyncSession): The database session to use, passed in via the `db_dependency`.
         user_verification (UserVerification): The verification details, containing the old and new passwords.
 
     Returns:
@@ -77,13 +96,16 @@ async def change_password(user: user_dependency,
     """
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
-    user_model = db.query(Users).filter(Users.id == user.get('id')).first()
+    user_model = await db.scalar(select(Users).filter(Users.id == user.get('id')))
     
-    if not bcrypt_context.verify(user_verification.password, user_model.hashed_password):
-        raise HTTPException(status_code=401, detail="Incorrect old password")
-    user_model.hashed_password = bcrypt_context.hash(user_verification.new_password)
+    if not await password_hasher.verify(user_verification.password, user_model.hashed_password):
+        raise HTTPException(status_code=401, detail="Error on password change")
+    user_model.hashed_password = await password_hasher.hash(user_verification.new_password)
     db.add(user_model)
-    db.commit()
+    await db.commit()
+    revocation_store.revoke_user(user_model.id)
+    token_cache.invalidate_user(user_model.id)
+    todo_events.close(user_model.id)
     
 
 @router.put("/{phone_number/{phone_number}}", status_code=status.HTTP_204_NO_CONTENT)
@@ -92,10 +114,10 @@ async def update_phone_number(user: user_dependency,
                               phone_number: str):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
-    user_model = db.query(Users).filter(Users.id == user.get('id')).first()
+    user_model = await db.scalar(select(Users).filter(Users.id == user.get('id')))
     user_model.phone_number = phone_number
     db.add(user_model)
-    db.commit()
+    await db.commit()
     
     
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -104,8 +126,11 @@ async def delete_user(user: user_dependency,
                       user_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication failed")
-    user_model = db.query(Users).filter(Users.id == user_id).first()
+    user_model = await db.scalar(select(Users).filter(Users.id == user_id))
     if user_model is None:
         raise HTTPException(status_code=404, detail="User not found")
-    db.query(Users).filter(Users.id == user_id).delete()
-    db.commit() 
\ No newline at end of file
+    await db.execute(delete(Users).filter(Users.id == user_id))
+    await db.commit()
+    revocation_store.revoke_user(user_id)
+    token_cache.invalidate_user(user_id)
+    todo_events.close(user_id)
\ No newline at end of file
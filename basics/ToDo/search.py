@@ -0,0 +1,84 @@
+import re
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+from .models import Todos
+
+# SQLite keeps an FTS5 index over title/description in sync through triggers.
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5("
+    "title, description, content='todos', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_update AFTER UPDATE OF title, description ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+# PostgreSQL uses an expression GIN index, which it maintains on every write.
+POSTGRES_TSVECTOR = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))"
+POSTGRES_SEARCH_DDL = (
+    f"CREATE INDEX IF NOT EXISTS ix_todos_search ON todos USING gin ({POSTGRES_TSVECTOR})",
+)
+
+def create_search_index(engine):
+    """
+    Create the full-text index for the engine's database if it is missing.
+
+    On SQLite a newly created FTS table is filled from the existing todos.
+
+    Args:
+        engine (Engine): A synchronous engine.
+    """
+    with engine.begin() as connection:
+        if connection.dialect.name == "sqlite":
+            exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'todos_fts'")).first()
+            for ddl in SQLITE_SEARCH_DDL:
+                connection.execute(text(ddl))
+            if exists is None:
+                connection.execute(text("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')"))
+        elif connection.dialect.name == "postgresql":
+            for ddl in POSTGRES_SEARCH_DDL:
+                connection.execute(text(ddl))
+
+def search_terms(query: str):
+    """Split a search query into its word tokens."""
+    return re.findall(r"\w+", query)
+
+def search_statement(dialect: str, owner_id: int, query: str, limit: int):
+    """
+    Build the ranked search SELECT for one user's todos.
+
+    Every word of ``query`` must match; the last word also matches as a
+    prefix so results update while the user is typing.
+
+    Args:
+        dialect (str): The database dialect name.
+        owner_id (int): The id of the user whose todos are searched.
+        query (str): The search text.
+        limit (int): The maximum number of todos to return.
+
+    Returns:
+        Select: A statement selecting `Todos`, best match first.
+    """
+    terms = search_terms(query)
+    stmt = select(Todos).filter(Todos.owner_id == owner_id)
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"' for term in terms) + "*"
+        fts = table("todos_fts", column("rowid"))
+        fts_column = literal_column("todos_fts")
+        stmt = (stmt.join(fts, fts.c.rowid == Todos.id)
+                .filter(fts_column.op("MATCH")(match))
+                .order_by(func.bm25(fts_column), Todos.id))
+    elif dialect == "postgresql":
+        tsquery = func.to_tsquery("english", " & ".join(terms[:-1] + [f"{terms[-1]}:*"]))
+        tsvector = literal_column(POSTGRES_TSVECTOR)
+        stmt = stmt.filter(tsvector.op("@@")(tsquery)).order_by(func.ts_rank(tsvector, tsquery).desc(), Todos.id)
+    else:
+        for term in terms:
+            pattern = f"%{term}%"
+            stmt = stmt.filter(or_(Todos.title.ilike(pattern), Todos.description.ilike(pattern)))
+        stmt = stmt.order_by(Todos.id)
+    return stmt.limit(limit)
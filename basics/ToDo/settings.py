@@ -0,0 +1,92 @@
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+
+CONFIG_FILE = Path(__file__).with_name("config.json")
+
+class Settings(BaseModel):
+    """
+    Application settings.
+
+    Values come from the JSON config file (``config.json`` next to this
+    module, or the file named by ``TODO_CONFIG_FILE``) and are overridden
+    by environment variables named after the upper-cased field, e.g.
+    ``DATABASE_URL`` or ``DB_POOL_SIZE``.
+    """
+
+    database_url: str = "sqlite:///./todosapp.db"
+    db_pool_size: int = Field(default=5, gt=0)
+    db_max_overflow: int = Field(default=10, ge=0)
+    db_pool_timeout: float = Field(default=30, gt=0)
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    sqlite_busy_timeout_ms: int = Field(default=5000, ge=0)
+    slow_query_ms: float = Field(default=200, ge=0)
+
+    readiness_cache_seconds: float = Field(default=2, ge=0)
+    readiness_ping_timeout: float = Field(default=1, gt=0)
+    readiness_max_in_flight: int = Field(default=200, gt=0)
+    readiness_max_pool_saturation: float = Field(default=0.9, gt=0, le=1)
+
+    secret_key: str
+    algorithm: str
+    access_token_expire_minutes: int = Field(default=20, gt=0)
+    refresh_token_expire_days: int = Field(default=7, gt=0)
+
+    bcrypt_rounds: int = Field(default=12, ge=4, le=31)
+    hash_workers: int = Field(default_factory=lambda: os.cpu_count() or 1, gt=0)
+    hash_queue_depth: int = Field(default=64, ge=0)
+
+    token_cache_size: int = Field(default=10000, gt=0)
+    token_cache_ttl: int = Field(default=300, gt=0)
+    revocation_db_path: Optional[str] = None
+
+    cache_backend: Literal["memory", "redis"] = "memory"
+    cache_url: str = "redis://localhost:6379/0"
+    cache_size: int = Field(default=10000, gt=0)
+    cache_ttl: int = Field(default=60, gt=0)
+
+    rate_limit_backend: Literal["memory", "redis"] = "memory"
+    rate_limit_max_keys: int = Field(default=100000, gt=0)
+    rate_limit_window_seconds: float = Field(default=60, gt=0)
+    login_attempts_per_ip: int = Field(default=20, gt=0)
+    login_attempts_per_username: int = Field(default=5, gt=0)
+    signup_attempts_per_ip: int = Field(default=5, gt=0)
+    password_change_attempts_per_user: int = Field(default=5, gt=0)
+
+    idempotency_ttl: int = Field(default=86400, gt=0)
+    idempotency_max_keys: int = Field(default=100000, gt=0)
+
+    event_queue_size: int = Field(default=100, ge=2)
+    event_keepalive_seconds: float = Field(default=15, gt=0)
+    event_ticket_seconds: int = Field(default=30, gt=0)
+
+def load_settings(config_file=None, environ=None):
+    """
+    Build a `Settings` object from a JSON file and environment variables.
+
+    Args:
+        config_file (str): The JSON file to read; keys are matched case-insensitively.
+        environ (Mapping): The environment to read overrides from, `os.environ` by default.
+
+    Returns:
+        Settings: The validated settings.
+    """
+    environ = os.environ if environ is None else environ
+    config_file = config_file or environ.get("TODO_CONFIG_FILE") or CONFIG_FILE
+    with open(config_file, 'r') as file:
+        values = {key.lower(): value for key, value in json.load(file).items()}
+    for name in Settings.model_fields:
+        if name.upper() in environ:
+            values[name] = environ[name.upper()]
+    return Settings(**values)
+
+@lru_cache
+def get_settings():
+    """
+    Return the process-wide settings, loading them on first use.
+    """
+    return load_settings()
@@ -2,6 +2,7 @@ from .utils import *
 from ..routers.admin import get_db, get_current_user
 from fastapi import status
 from ..models import Todos
+import json
 
 app.dependency_overrides[get_db] = override_get_db
 app.dependency_overrides[get_current_user] = override_get_current_user
@@ -14,6 +15,37 @@ def test_admin_read_all_authenticated(test_todo):
                                 'priority': 5, 'owner_id': 1}]
 
 
+def test_admin_read_all_paginated(test_todo):
+    db = TestingSessionLocal()
+    db.add(Todos(title='Other', description='Other owner', priority=1, complete=True, owner_id=2))
+    db.commit()
+
+    response = client.get("/admin/todo?limit=1&fields=owner_id")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{'owner_id': 1}]
+    assert response.headers['X-Next-Cursor'] == '1'
+
+    response = client.get("/admin/todo?limit=1&fields=owner_id&cursor=1")
+    assert response.json() == [{'owner_id': 2}]
+
+
+def test_admin_export_ndjson(test_todo):
+    response = client.get("/admin/todo/export")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {'id': 1, 'title': 'Learn to code!', 'description': 'Need to learn everyday!',
+         'priority': 5, 'complete': False, 'owner_id': 1}]
+
+
+def test_admin_export_csv(test_todo):
+    response = client.get("/admin/todo/export?format=csv")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'].startswith('text/csv')
+    assert response.text.splitlines() == ['id,title,description,priority,complete,owner_id',
+                                          '1,Learn to code!,Need to learn everyday!,5,False,1']
+
+
 def test_admin_delete_todo(test_todo):
     response = client.delete("/admin/todo/1")
     assert response.status_code == 204
@@ -27,13 +59,3 @@ def test_admin_delete_todo_not_found():
     response = client.delete("/admin/todo/9999")
     assert response.status_code == 404
     assert response.json() == {'detail': 'Todo not found.'}
-
-
-
-
-
-
-
-
-
-
@@ -1,24 +1,30 @@
 from .utils import *
-from ..routers.auth import get_db, authenticate_user, create_access_token, SECRET_KEY, ALGORITHM, get_current_user
+from ..routers.auth import get_db, authenticate_user, create_access_token, create_refresh_token, SECRET_KEY, ALGORITHM, get_current_user
+from ..revocation import RevocationStore, revocation_store
 from jose import jwt
 from datetime import timedelta
 import pytest
 from fastapi import HTTPException
+from ..hashing import PasswordHasher, password_hasher
+from ..token_cache import TokenCache, token_cache
+from ..settings import get_settings
 
-app.dependency_overrides[get_db] = override_get_db
+settings = get_settings()
 
-def test_authenticate_user(test_user):
-    db = TestingSessionLocal()
+app.dependency_overrides[get_db] = override_get_db
 
-    authenticated_user = authenticate_user(test_user.username, 'testpassword', db)
-    assert authenticated_user is not None
-    assert authenticated_user.username == test_user.username
+@pytest.mark.asyncio
+async def test_authenticate_user(test_user):
+    async with TestingAsyncSessionLocal() as db:
+        authenticated_user = await authenticate_user(test_user.username, 'testpassword', db)
+        assert authenticated_user is not None
+        assert authenticated_user.username == test_user.username
 
-    non_existent_user = authenticate_user('WrongUserName', 'testpassword', db)
-    assert non_existent_user is False
+        non_existent_user = await authenticate_user('WrongUserName', 'testpassword', db)
+        assert non_existent_user is False
 
-    wrong_password_user = authenticate_user(test_user.username, 'wrongpassword', db)
-    assert wrong_password_user is False
+        wrong_password_user = await authenticate_user(test_user.username, 'wrongpassword', db)
+        assert wrong_password_user is False
 
 
 def test_create_access_token():
@@ -43,7 +49,7 @@ async def test_get_current_user_valid_token():
     token = jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
     user = await get_current_user(token=token)
-    assert user == {'username': 'testuser', 'id': 1, 'user_role': 'admin'}
+    assert user == {'username': 'testuser', 'id': 1, 'role': 'admin'}
 
 
 @pytest.mark.asyncio
@@ -58,8 +64,181 @@ async def test_get_current_user_missing_payload():
     assert excinfo.value.detail == 'Could not validate user.'
 
 
+@pytest.mark.asyncio
+async def test_password_hasher_round_trip():
+    hasher = PasswordHasher(bcrypt_context, workers=2, queue_depth=2)
+    hashed = await hasher.hash('testpassword')
+
+    assert await hasher.verify('testpassword', hashed)
+    assert not await hasher.verify('wrongpassword', hashed)
+    assert hasher.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_queue_full():
+    hasher = PasswordHasher(bcrypt_context, workers=1, queue_depth=0)
+    hasher.pending = 1
+
+    with pytest.raises(HTTPException) as excinfo:
+        await hasher.hash('testpassword')
+
+    assert excinfo.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_uses_token_cache():
+    token_cache.clear()
+    token = create_access_token('cacheduser', 7, 'user', timedelta(minutes=5))
+    misses = token_cache.misses
+
+    first = await get_current_user(token=token)
+    hits = token_cache.hits
+    second = await get_current_user(token=token)
+
+    assert first == second == {'username': 'cacheduser', 'id': 7, 'role': 'user'}
+    assert token_cache.misses == misses + 1
+    assert token_cache.hits == hits + 1
+
+
+def test_token_cache_expiry_and_invalidation():
+    cache = TokenCache(max_size=2, ttl=60)
+    cache.put('expired', {'id': 1}, expires_at=0)
+    assert cache.get('expired') is None
 
+    cache.put('a', {'id': 1})
+    cache.put('b', {'id': 2})
+    cache.put('c', {'id': 2})
+    assert cache.get('a') is None
+    assert cache.get('b') == {'id': 2}
 
+    cache.invalidate_user(2)
+    assert cache.get('b') is None
+    assert cache.get('c') is None
+    assert cache.stats()['size'] == 0
 
 
+def test_login_and_refresh_rotation(test_user):
+    response = client.post('/auth/token', data={'username': 'Admin', 'password': 'testpassword'})
+    assert response.status_code == 200
+    tokens = response.json()
+    assert tokens['token_type'] == 'bearer'
 
+    response = client.post('/auth/refresh', json={'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 200
+    refreshed = response.json()
+    assert refreshed['refresh_token'] != tokens['refresh_token']
+
+    response = client.post('/auth/refresh', json={'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 401
+
+
+def test_refresh_rejects_access_token():
+    token = create_access_token('testuser', 1, 'user', timedelta(minutes=5))
+    response = client.post('/auth/refresh', json={'refresh_token': token})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_rejects_refresh_token():
+    token = create_refresh_token('testuser', 1, 'user', timedelta(minutes=5))
+
+    with pytest.raises(HTTPException) as excinfo:
+        await get_current_user(token=token)
+
+    assert excinfo.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_revoked_user():
+    revocation_store.clear()
+    token = create_access_token('revokeduser', 42, 'user', timedelta(minutes=5))
+    assert (await get_current_user(token=token))['id'] == 42
+
+    revocation_store.revoke_user(42)
+    with pytest.raises(HTTPException) as excinfo:
+        await get_current_user(token=token)
+    assert excinfo.value.status_code == 401
+    revocation_store.clear()
+
+
+def test_logout_revokes_tokens():
+    access = create_access_token('testuser', 1, 'user', timedelta(minutes=5))
+    refresh = create_refresh_token('testuser', 1, 'user', timedelta(minutes=5))
+
+    response = client.post('/auth/logout', json={'refresh_token': refresh},
+                           headers={'Authorization': f'Bearer {access}'})
+    assert response.status_code == 204
+
+    response = client.post('/auth/refresh', json={'refresh_token': refresh})
+    assert response.status_code == 401
+
+
+def test_revocation_store_persistence(tmp_path):
+    path = tmp_path / 'revoked.db'
+    store = RevocationStore(str(path))
+    store.revoke_token('abc', expires_at=4102444800)
+    store.revoke_token('expired', expires_at=1)
+    store.revoke_user(7)
+    store.flush()
+
+    reloaded = RevocationStore(str(path))
+    assert reloaded.is_revoked('abc', 1, None)
+    assert not reloaded.is_revoked('expired', 1, None)
+    assert reloaded.is_revoked(None, 7, 0)
+    assert not reloaded.is_revoked(None, 8, 0)
+
+
+def test_revocation_store_purges_expired_tokens(monkeypatch):
+    store = RevocationStore()
+    now = [1000.0]
+    monkeypatch.setattr('ToDo.revocation.time.time', lambda: now[0])
+    store.revoke_token('short', expires_at=1010)
+    store.revoke_token('long', expires_at=2000)
+    store.revoke_token('renewed', expires_at=1010)
+    store.revoke_token('renewed', expires_at=3000)
+
+    now[0] = 1500.0
+    store.revoke_token('new', expires_at=4000)
+    assert not store.is_revoked('short', 1, None)
+    assert store.is_revoked('long', 1, None)
+    assert store.is_revoked('renewed', 1, None)
+    assert sorted(store._tokens) == ['long', 'new', 'renewed']
+
+
+def test_login_is_rate_limited_per_username():
+    attempts = [client.post('/auth/token', data={'username': 'Victim', 'password': f'guess{n}'})
+                for n in range(settings.login_attempts_per_username + 1)]
+    assert [response.status_code for response in attempts[:-1]] == [401] * settings.login_attempts_per_username
+    assert attempts[-1].status_code == 429
+    assert int(attempts[-1].headers['Retry-After']) > 0
+
+    response = client.post('/auth/token', data={'username': 'someone-else', 'password': 'guess'})
+    assert response.status_code == 401
+
+
+def test_create_user_idempotency_key_replays(monkeypatch):
+    hashed = []
+    original_hash = password_hasher.hash
+
+    async def counting_hash(password):
+        hashed.append(password)
+        return await original_hash(password)
+
+    monkeypatch.setattr(password_hasher, 'hash', counting_hash)
+    request_data = {'username': 'newuser', 'first_name': 'New', 'last_name': 'User',
+                    'email': 'new@email.com', 'hashed_password': 'secret-password',
+                    'role': 'user', 'phone_number': '(222)-222-2222'}
+    headers = {'Idempotency-Key': 'signup-1'}
+    try:
+        first = client.post('/auth/', json=request_data, headers=headers)
+        retry = client.post('/auth/', json=request_data, headers=headers)
+
+        assert first.status_code == retry.status_code == 201
+        assert retry.headers['Idempotent-Replayed'] == 'true'
+        assert len(hashed) == 1
+        db = TestingSessionLocal()
+        assert db.query(Users).filter(Users.username == 'newuser').count() == 1
+    finally:
+        with engine.connect() as connection:
+            connection.execute(text("DELETE FROM users;"))
+            connection.commit()
@@ -0,0 +1,27 @@
+from .utils import *
+from ..benchmark import SCENARIOS, percentile, run_benchmark
+import pytest
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.99) == 7
+    assert percentile([], 0.5) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_run_benchmark_smoke(tmp_path):
+    overrides = dict(app.dependency_overrides)
+    report = await run_benchmark(f"sqlite:///{tmp_path / 'benchmark.db'}", users=2,
+                                 todos_per_user=5, requests=4, concurrency=2)
+
+    assert list(report['scenarios']) == list(SCENARIOS)
+    for summary in report['scenarios'].values():
+        assert summary['requests'] == 4
+        assert summary['errors'] == 0
+        assert summary['p50_ms'] <= summary['p95_ms'] <= summary['p99_ms'] <= summary['max_ms']
+    assert report['config']['users'] == 2
+    assert app.dependency_overrides == overrides
@@ -0,0 +1,122 @@
+import pytest
+from fastapi.testclient import TestClient
+import books
+from book_storage import Book, MemoryBookStore, SQLBookStore, create_book_store, load_book_settings
+
+
+def make_book(title, author='Jane Austen', rating=3, published_date=None):
+    return Book(None, title, author, 'A book', rating, published_date)
+
+
+@pytest.mark.asyncio
+async def test_memory_book_store_does_not_reuse_ids():
+    store = MemoryBookStore([Book(5, 'Emma', 'Jane Austen', 'Matchmaking', 4, 1815)])
+    first = await store.add(make_book('Persuasion'))
+    assert first.id == 6
+
+    assert await store.delete(6)
+    assert (await store.add(make_book('Sanditon'))).id == 7
+    assert not await store.update(Book(9, 'Unknown', 'Nobody', 'Missing', 1, None))
+    assert (await store.add(make_book('Lady Susan'))).id == 8
+
+
+@pytest.mark.asyncio
+async def test_sql_book_store_does_not_reuse_ids(tmp_path):
+    store = SQLBookStore(f"sqlite:///{tmp_path / 'books.db'}")
+    await store.setup()
+    try:
+        first = await store.add(make_book('Emma'))
+        second = await store.add(make_book('Persuasion'))
+        assert await store.delete(second.id)
+        third = await store.add(make_book('Sanditon'))
+
+        assert (first.id, second.id, third.id) == (1, 2, 3)
+        assert [book.id for book in await store.all()] == [1, 3]
+    finally:
+        await store.dispose()
+
+
+@pytest.mark.asyncio
+async def test_memory_book_store_indexes_follow_writes():
+    store = MemoryBookStore([Book(1, 'Dune', 'Frank Herbert', 'Spice', 5, 1965),
+                             Book(2, 'Emma', 'Jane Austen', 'Matchmaking', 3, 1815)])
+
+    assert await store.update(Book(2, 'Emma', 'JANE AUSTEN', 'Matchmaking', 4, 1816))
+    assert store._ratings == [4, 5]
+    assert store._authors == ['frank herbert', 'jane austen']
+    assert store._years == [1816, 1965]
+    assert await store.by_rating(3) == []
+    assert await store.by_published_date(1815) == []
+    assert [book.id for book in await store.by_author('Jane Austen')] == [2]
+
+    persuasion = await store.add(make_book('Persuasion', rating=4))
+    assert store._years == [1816, 1965]
+    assert await store.by_published_date(None) == [persuasion]
+    assert [book.id for book in await store.by_rating(4)] == [2, persuasion.id]
+
+    assert await store.delete(2)
+    assert await store.delete(1)
+    assert store._ratings == [4]
+    assert store._authors == ['jane austen']
+    assert store._years == []
+    assert set(store._by_rating) == {4}
+    assert set(store._by_author) == {'jane austen'}
+    assert set(store._by_published_date) == {None}
+    assert not await store.delete(1)
+    assert await store.query(min_year=0) == []
+
+
+QUERY_BOOKS = [
+    ('Dune', 'Frank Herbert', 5, 1965),
+    ('Children of Dune', 'Frank Herbert', 4, 1976),
+    ('Foundation', 'Isaac Asimov', 5, 1951),
+    ('I, Robot', 'isaac asimov', 3, 1950),
+    ('Percent', '100% Author', 2, 2001),
+    ('Thousand', '1000 Authors', 2, 2002),
+    ('Underscore', 'A_B Writer', 4, None),
+    ('Abba', 'ABC Writer', 1, 2010),
+]
+
+
+@pytest.fixture(params=['memory', 'sql'])
+def books_client(request, tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'books.db'}" if request.param == 'sql' else None
+    monkeypatch.setattr(books, 'BOOKS', create_book_store(url))
+    with TestClient(books.app) as client:
+        for title, author, rating, published_date in QUERY_BOOKS:
+            response = client.post('/create_book', json={'title': title, 'author': author, 'description': 'A book',
+                                                         'rating': rating, 'published_date': published_date})
+            assert response.status_code == 201
+        yield client
+
+
+@pytest.mark.parametrize('params, ids', [
+    ('min_rating=4', [1, 2, 3, 7]),
+    ('min_rating=2&max_rating=4', [2, 4, 5, 6, 7]),
+    ('min_year=1951&max_year=1976', [1, 2, 3]),
+    ('author=ISAAC', [3, 4]),
+    ('author=100%25', [5]),
+    ('author=a_', [7]),
+    ('author=frank&min_rating=5', [1]),
+    ('sort=published_date', [7, 4, 3, 1, 2, 5, 6, 8]),
+    ('sort=published_date&order=desc&limit=2', [8, 6]),
+    ('sort=rating&order=desc&limit=3', [3, 1, 7]),
+    ('sort=title&offset=2&limit=2', [1, 3]),
+    ('min_rating=5&offset=5', []),
+])
+def test_query_books(books_client, params, ids):
+    response = books_client.get(f'/books/query?{params}')
+    assert response.status_code == 200
+    assert [book['id'] for book in response.json()] == ids
+
+
+def test_query_books_rejects_unknown_sort(books_client):
+    assert books_client.get('/books/query?sort=description').status_code == 422
+
+
+def test_load_book_settings_reads_prefixed_environment():
+    settings = load_book_settings({'BOOKS_DATABASE_URL': 'sqlite:///./books.db', 'BOOKS_DB_POOL_SIZE': '2',
+                                   'DATABASE_URL': 'sqlite:///./todosapp.db', 'SECRET_KEY': 'unused'})
+    assert settings.database_url == 'sqlite:///./books.db'
+    assert settings.db_pool_size == 2
+    assert load_book_settings({}).database_url is None
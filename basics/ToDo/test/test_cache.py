@@ -0,0 +1,30 @@
+import pytest
+from .utils import FakeRedis
+from ..cache import MemoryCache, RedisCache, TodoCache
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('backend', [MemoryCache(max_size=100), RedisCache(FakeRedis())])
+async def test_todo_cache_invalidation(backend):
+    cache = TodoCache(backend, ttl=60)
+    key, entry = await cache.get(1, 'page')
+    assert entry is None
+    entry = await cache.set(key, [{'id': 1}], next_cursor=None)
+
+    assert (await cache.get(1, 'page'))[1] == entry
+    assert (await cache.get(2, 'page'))[1] is None
+
+    await cache.invalidate(1)
+    assert (await cache.get(1, 'page'))[1] is None
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_clear_deletes_only_its_prefix():
+    client = FakeRedis()
+    client.data['todoapp:ratelimit:login'] = 'kept'
+    cache = RedisCache(client)
+    for n in range(1200):
+        await cache.set(f'todos:{n}:generation', 'g', ttl=60)
+
+    await cache.clear()
+    assert client.data == {'todoapp:ratelimit:login': 'kept'}
@@ -0,0 +1,107 @@
+from ..events import TodoEventBroker, event_stream
+from ..revocation import revocation_store
+from ..routers.auth import access_token_claims, create_access_token, create_stream_ticket, get_stream_user
+from datetime import timedelta
+from fastapi import HTTPException
+import time
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_todo_event_broker_fans_out_per_user():
+    broker = TodoEventBroker(queue_size=10)
+    first, second, other = broker.subscribe(1), broker.subscribe(1), broker.subscribe(2)
+
+    broker.publish(1, 'created', [5], 7)
+
+    assert await first.get() == {'type': 'created', 'ids': [5], 'revision': 7}
+    assert await second.get() == {'type': 'created', 'ids': [5], 'revision': 7}
+    assert other.queue.empty()
+
+    for subscription in (first, second, other):
+        broker.unsubscribe(subscription)
+    assert broker.subscriber_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_todo_event_broker_drops_events_for_slow_clients():
+    broker = TodoEventBroker(queue_size=3)
+    subscription = broker.subscribe(1)
+
+    for revision in range(1, 6):
+        broker.publish(1, 'updated', [1], revision)
+
+    events = [await subscription.get() for _ in range(3)]
+    assert [event['type'] for event in events] == ['updated', 'updated', 'resync']
+    assert subscription.queue.empty()
+
+    broker.publish(1, 'deleted', [1], 6)
+    assert (await subscription.get())['type'] == 'deleted'
+
+
+@pytest.mark.asyncio
+async def test_todo_event_stream():
+    broker = TodoEventBroker(queue_size=10)
+    subscription = broker.subscribe(1)
+    stream = event_stream(broker, subscription, keepalive=0.01)
+
+    assert await stream.__anext__() == ': connected\n\n'
+    assert await stream.__anext__() == ': keepalive\n\n'
+    broker.publish(1, 'created', [3], 4)
+    assert await stream.__anext__() == 'event: created\ndata: {"type": "created", "ids": [3], "revision": 4}\n\n'
+
+    await stream.aclose()
+    assert broker.subscriber_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_todo_event_stream_ends_when_closed():
+    broker = TodoEventBroker(queue_size=3)
+    kept, closed = broker.subscribe(1, 'kept'), broker.subscribe(1, 'revoked')
+    stream = event_stream(broker, closed, keepalive=10)
+    assert await stream.__anext__() == ': connected\n\n'
+
+    for revision in range(1, 6):
+        broker.publish(1, 'updated', [1], revision)
+    broker.close(1, 'revoked')
+
+    assert [message async for message in stream][-1].startswith('event: resync')
+    assert broker.subscriber_count() == 1
+    broker.close(1)
+    assert [(await kept.get())['type'] for _ in range(4)] == ['updated', 'updated', 'resync', 'close']
+
+
+@pytest.mark.asyncio
+async def test_todo_event_stream_ends_when_token_expires():
+    broker = TodoEventBroker(queue_size=10)
+    stream = event_stream(broker, broker.subscribe(1), keepalive=10, expires_at=time.time() + 0.05)
+
+    assert [message async for message in stream] == [': connected\n\n']
+    assert broker.subscriber_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_event_stream_ticket_is_single_use():
+    revocation_store.clear()
+    claims = access_token_claims(create_access_token('testuser', 1, 'user', timedelta(minutes=5)))
+    ticket = create_stream_ticket(claims)
+
+    user = await get_stream_user(None, ticket)
+    assert user == claims
+    with pytest.raises(HTTPException) as excinfo:
+        await get_stream_user(None, ticket)
+    assert excinfo.value.status_code == 401
+    revocation_store.clear()
+
+
+@pytest.mark.asyncio
+async def test_event_stream_ticket_follows_access_token_revocation():
+    revocation_store.clear()
+    claims = access_token_claims(create_access_token('testuser', 1, 'user', timedelta(minutes=5)))
+    ticket = create_stream_ticket(claims)
+
+    revocation_store.revoke_token(claims['jti'], claims['exp'])
+    with pytest.raises(HTTPException) as excinfo:
+        await get_stream_user(None, ticket)
+    assert excinfo.value.status_code == 401
+    revocation_store.clear()
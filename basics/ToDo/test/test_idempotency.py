@@ -0,0 +1,46 @@
+import json
+import pytest
+from fastapi import HTTPException, status
+from .utils import FakeRedis
+from ..cache import RedisCache
+from ..idempotency import IdempotencyStore, MemoryIdempotencyBackend
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('backend', [MemoryIdempotencyBackend(max_size=100), RedisCache(FakeRedis())])
+async def test_idempotency_store_claims_keys(backend):
+    store = IdempotencyStore(backend, ttl=60, secret='secret')
+    assert await store.start('todo:1', 'key', {'a': 1}) is None
+
+    with pytest.raises(HTTPException) as error:
+        await store.start('todo:1', 'key', {'a': 1})
+    assert error.value.status_code == status.HTTP_409_CONFLICT
+    assert await store.start('todo:2', 'key', {'a': 1}) is None
+
+    await store.abort('todo:1', 'key')
+    assert await store.start('todo:1', 'key', {'a': 1}) is None
+    await store.finish('todo:1', 'key', {'a': 1}, 201, {'id': 7})
+    replay = await store.start('todo:1', 'key', {'a': 1})
+    assert replay.status_code == 201
+    assert json.loads(replay.body) == {'id': 7}
+    assert await store.start('todo:1', None, {'a': 1}) is None
+
+
+@pytest.mark.asyncio
+async def test_memory_idempotency_backend_only_expires_keys(monkeypatch):
+    backend = MemoryIdempotencyBackend(max_size=2)
+    now = [1000.0]
+    monkeypatch.setattr('ToDo.idempotency.time.time', lambda: now[0])
+    assert await backend.add('first', 1, ttl=60)
+    assert await backend.add('second', 2, ttl=120)
+
+    with pytest.raises(HTTPException) as error:
+        await backend.add('third', 3, ttl=60)
+    assert error.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert error.value.headers['Retry-After'] == '60'
+    assert await backend.get('first') == 1
+
+    now[0] += 60
+    assert await backend.get('first') is None
+    assert await backend.add('third', 3, ttl=60)
+    assert await backend.get('second') == 2
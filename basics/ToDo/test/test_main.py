@@ -1,6 +1,11 @@
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
 from ..main import app
+from ..database import async_engine
+from ..health import ReadinessProbe
+from ..settings import Settings
 from fastapi import status
+import pytest
 
 client = TestClient(app)
 
@@ -11,3 +16,58 @@ def test_return_health_check():
     assert response.json() == {'status': 'Healthy'}
 
 
+def test_readiness_check():
+    response = client.get("/ready")
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body['status'] == 'Ready'
+    assert body['database'] == 'ok'
+    assert body['in_flight'] >= 1
+
+
+class FakePoolMetrics:
+    def __init__(self, checked_out):
+        self.checked_out = checked_out
+
+    def snapshot(self):
+        return {'size': 5, 'max_overflow': 5, 'checked_out': self.checked_out}
+
+
+class FakeMetrics:
+    in_flight = 0
+
+
+def readiness_settings(**overrides):
+    values = {'secret_key': 'secret', 'algorithm': 'HS256', 'readiness_cache_seconds': 60, **overrides}
+    return Settings(**values)
+
+
+@pytest.mark.asyncio
+async def test_readiness_probe_reports_overload():
+    metrics = FakeMetrics()
+    probe = ReadinessProbe(async_engine, FakePoolMetrics(checked_out=9), metrics,
+                           readiness_settings(readiness_max_in_flight=10))
+    metrics.in_flight = 11
+
+    ready, body = await probe.check()
+
+    assert not ready
+    assert body['status'] == 'Unavailable'
+    assert body['database'] == 'ok'
+    assert body['pool_saturation'] == 0.9
+    assert body['reasons'] == ['connection pool 90% checked out', '11 requests in flight']
+
+
+@pytest.mark.asyncio
+async def test_readiness_probe_caches_failed_ping(tmp_path):
+    broken_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'app.db'}")
+    probe = ReadinessProbe(broken_engine, FakePoolMetrics(checked_out=0), FakeMetrics(), readiness_settings())
+
+    ready, body = await probe.check()
+    assert not ready
+    assert body['database'] == 'unavailable'
+    assert body['reasons'] == ['database ping failed: OperationalError']
+
+    pinged_at = probe._pinged_at
+    await probe.check()
+    assert probe._pinged_at == pinged_at
@@ -0,0 +1,86 @@
+from .utils import *
+from ..database import get_db
+from ..instrumentation import AppMetrics, MetricsMiddleware
+from ..routers.auth import get_current_user
+from fastapi import status
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+import asyncio
+import logging
+import pytest
+
+
+def test_read_pool_metrics():
+    response = client.get("/metrics/pool")
+    assert response.status_code == status.HTTP_200_OK
+    metrics = response.json()
+    assert metrics['pool'] == 'MeteredAsyncQueuePool'
+    assert metrics['size'] == 5
+    assert metrics['checked_out'] >= 0
+    assert metrics['idle'] >= 0
+    assert 'wait_seconds_max' in metrics
+
+
+def test_prometheus_metrics_count_queries_per_route(test_todo):
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    client.get("/todo/1")
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'].startswith('text/plain')
+    lines = response.text.splitlines()
+    assert 'http_request_duration_seconds_count{method="GET",route="/todo/{id}",status="200"} 1' in lines
+    queries = next(line for line in lines
+                   if line.startswith('http_request_db_queries_sum{method="GET",route="/todo/{id}"}'))
+    assert float(queries.split()[-1]) >= 1
+    assert any(line.startswith('db_pool_checkouts_total ') for line in lines)
+    assert any(line.startswith('db_slow_queries_total ') for line in lines)
+
+
+def test_slow_queries_are_logged(caplog):
+    metrics = AppMetrics(slow_query_seconds=0.5)
+    with caplog.at_level(logging.WARNING, logger='ToDo.instrumentation'):
+        metrics.record_query("SELECT 1", 0.1)
+        metrics.record_query("SELECT * FROM todos", 0.75)
+    assert metrics.slow_queries == 1
+    assert [record.getMessage() for record in caplog.records] == ['Slow query (750.0 ms): SELECT * FROM todos']
+
+
+def test_failed_query_does_not_skew_next_duration(monkeypatch):
+    metrics = AppMetrics(slow_query_seconds=0.5)
+    sync_engine = create_engine("sqlite://")
+    metrics.instrument(sync_engine)
+    clock = iter([0.0, 100.0, 100.25])
+    monkeypatch.setattr('ToDo.instrumentation.time.perf_counter', lambda: next(clock))
+    durations = []
+    monkeypatch.setattr(metrics, 'record_query', lambda statement, seconds: durations.append(seconds))
+
+    with sync_engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+        assert 'query_started' not in connection.info
+
+    assert durations == [0.25]
+
+
+def test_event_streams_are_counted_apart_from_requests():
+    metrics = AppMetrics(slow_query_seconds=1)
+    gauges = []
+
+    async def stream_app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream; charset=utf-8')]})
+        gauges.append((metrics.in_flight, metrics.open_streams))
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def send(message):
+        pass
+
+    middleware = MetricsMiddleware(stream_app, metrics)
+    asyncio.run(middleware({'type': 'http', 'method': 'GET'}, None, send))
+
+    assert gauges == [(0, 1)]
+    assert (metrics.in_flight, metrics.open_streams) == (0, 0)
+    assert not any(line.startswith('http_request_duration_seconds_count') for line in metrics.render())
+    assert 'http_event_streams_open 0' in metrics.render()
@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import create_engine, select, text
+from ..database import Base
+from ..models import Todos
+from ..pagination import TodoPage
+
+plan_engine = create_engine("sqlite://")
+Base.metadata.create_all(bind=plan_engine)
+
+
+def query_plan(stmt):
+    sql = str(stmt.compile(plan_engine, compile_kwargs={"literal_binds": True}))
+    with plan_engine.connect() as connection:
+        return [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def todo_page(cursor=None, complete=None, priority=None):
+    return TodoPage(cursor=cursor, limit=100, fields="id,title", complete=complete, priority=priority)
+
+
+@pytest.mark.parametrize("page, index", [
+    (todo_page(), "ix_todos_owner_id_id"),
+    (todo_page(cursor=10), "ix_todos_owner_id_id"),
+    (todo_page(complete=True), "ix_todos_owner_id_id"),
+    (todo_page(complete=False, priority=3), "ix_todos_owner_id_complete_priority"),
+])
+def test_read_all_uses_owner_index(page, index):
+    plan = query_plan(page.statement(Todos.owner_id == 1))
+    assert any(f"USING INDEX {index}" in step for step in plan), plan
+    assert not any(step.startswith("SCAN todos") for step in plan), plan
+
+
+def test_read_todo_uses_primary_key():
+    plan = query_plan(select(Todos).filter(Todos.id == 1).filter(Todos.owner_id == 1))
+    assert plan == ["SEARCH todos USING INTEGER PRIMARY KEY (rowid=?)"]
@@ -0,0 +1,26 @@
+import pytest
+from .utils import FakeRedis
+from ..rate_limit import MemoryRateLimiter, RedisRateLimiter
+
+
+@pytest.mark.asyncio
+async def test_memory_rate_limiter_refills(monkeypatch):
+    limiter = MemoryRateLimiter(max_size=10)
+    now = [100.0]
+    monkeypatch.setattr('ToDo.rate_limit.time.monotonic', lambda: now[0])
+
+    assert [await limiter.hit('key', 2, 0.5) for _ in range(3)] == [0, 0, 2.0]
+    now[0] += 2
+    assert await limiter.hit('key', 2, 0.5) == 0
+    assert await limiter.hit('other', 2, 0.5) == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_rate_limiter_clear_deletes_only_its_buckets():
+    client = FakeRedis()
+    client.data.update({'todoapp:ratelimit:login:ip:10.0.0.1': 'bucket',
+                        'todoapp:ratelimit:login:user:victim': 'bucket',
+                        'todoapp:cache:todos:1:generation': 'kept'})
+
+    await RedisRateLimiter(client).clear()
+    assert client.data == {'todoapp:cache:todos:1:generation': 'kept'}
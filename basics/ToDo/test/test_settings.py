@@ -0,0 +1,29 @@
+import json
+import pytest
+from pydantic import ValidationError
+from ..settings import load_settings, get_settings
+
+
+def test_load_settings_from_file_and_environment(tmp_path):
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({'SECRET_KEY': 'secret', 'ALGORITHM': 'HS256', 'DB_POOL_SIZE': 3}))
+
+    settings = load_settings(config_file, environ={'DB_POOL_SIZE': '8', 'DB_POOL_PRE_PING': 'false'})
+
+    assert settings.secret_key == 'secret'
+    assert settings.algorithm == 'HS256'
+    assert settings.db_pool_size == 8
+    assert settings.db_pool_pre_ping is False
+    assert settings.database_url == 'sqlite:///./todosapp.db'
+
+
+def test_load_settings_requires_algorithm(tmp_path):
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({'SECRET_KEY': 'secret'}))
+
+    with pytest.raises(ValidationError):
+        load_settings(config_file, environ={})
+
+
+def test_get_settings_is_cached():
+    assert get_settings() is get_settings()
@@ -1,7 +1,13 @@
 from ..routers.todos import get_db, get_current_user
 from fastapi import status
 from ..models import Todos
+from ..changes import allocate_revisions
+from ..routers.auth import create_access_token
+from ..settings import get_settings
 from .utils import *
+from datetime import timedelta
+from jose import jwt
+import pytest
 
 app.dependency_overrides[get_db] = override_get_db
 app.dependency_overrides[get_current_user] = override_get_current_user
@@ -15,6 +21,45 @@ def test_read_all_authenticated(test_todo):
                                 'priority': 5, 'owner_id': 1}]
 
 
+def test_read_all_paginated(test_todo):
+    db = TestingSessionLocal()
+    db.add_all([Todos(title=f'Todo {i}', description='Paged todo', priority=i,
+                      complete=i % 2 == 0, owner_id=1) for i in range(1, 5)])
+    db.add(Todos(title='Other', description='Other owner', priority=1, complete=False, owner_id=2))
+    db.commit()
+
+    response = client.get('/?limit=2&fields=id,title')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{'id': 1, 'title': 'Learn to code!'}, {'id': 2, 'title': 'Todo 1'}]
+    assert response.headers['X-Next-Cursor'] == '2'
+
+    response = client.get('/?limit=2&fields=id,title&cursor=2')
+    assert response.json() == [{'id': 3, 'title': 'Todo 2'}, {'id': 4, 'title': 'Todo 3'}]
+
+    response = client.get('/?limit=2&fields=id,title&cursor=4')
+    assert response.json() == [{'id': 5, 'title': 'Todo 4'}]
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_read_all_filtered(test_todo):
+    db = TestingSessionLocal()
+    db.add_all([Todos(title=f'Todo {i}', description='Paged todo', priority=i,
+                      complete=i % 2 == 0, owner_id=1) for i in range(1, 5)])
+    db.commit()
+
+    response = client.get('/?complete=true&fields=title')
+    assert response.json() == [{'title': 'Todo 2'}, {'title': 'Todo 4'}]
+
+    response = client.get('/?priority=5&fields=title')
+    assert response.json() == [{'title': 'Learn to code!'}]
+
+
+def test_read_all_unknown_field(test_todo):
+    response = client.get('/?fields=id,hashed_password')
+    assert response.status_code == 400
+    assert response.json() == {'detail': 'Unknown fields: hashed_password'}
+
+
 def test_read_one_authenticated(test_todo):
     response = client.get("/todo/1")
     assert response.status_code == status.HTTP_200_OK
@@ -90,14 +135,296 @@ def test_delete_todo_not_found():
     assert response.json() == {'detail': 'Todo not found.'}
 
 
+def test_create_todos_batch(test_todo):
+    request_data = [{'title': f'Batch {i}', 'description': 'Batch description',
+                     'priority': i, 'complete': False} for i in range(1, 4)]
+
+    response = client.post('/todo/batch', json=request_data)
+    assert response.status_code == 201
+    assert [todo['id'] for todo in response.json()] == [2, 3, 4]
+    assert [todo['title'] for todo in response.json()] == ['Batch 1', 'Batch 2', 'Batch 3']
+    assert all(todo['owner_id'] == 1 for todo in response.json())
+
+
+def test_create_todos_batch_invalid():
+    response = client.post('/todo/batch', json=[])
+    assert response.status_code == 422
+
+    response = client.post('/todo/batch', json=[{'title': 'x', 'description': 'Batch',
+                                                 'priority': 1, 'complete': False}])
+    assert response.status_code == 422
+
+
+def test_update_todos_batch(test_todo):
+    db = TestingSessionLocal()
+    db.add(Todos(title='Second', description='Second todo', priority=1, complete=False, owner_id=1))
+    db.commit()
+
+    request_data = [{'id': 1, 'title': 'First updated', 'description': 'Updated', 'priority': 2, 'complete': True},
+                    {'id': 2, 'title': 'Second updated', 'description': 'Updated', 'priority': 3, 'complete': True}]
+    response = client.patch('/todo/batch', json=request_data)
+    assert response.status_code == 204
+
+    db = TestingSessionLocal()
+    models = db.query(Todos).order_by(Todos.id).all()
+    assert [(model.title, model.priority, model.complete) for model in models] == [
+        ('First updated', 2, True), ('Second updated', 3, True)]
+
+
+def test_update_todos_batch_not_owned(test_todo):
+    db = TestingSessionLocal()
+    db.add(Todos(title='Other', description='Other owner', priority=1, complete=False, owner_id=2))
+    db.commit()
+
+    request_data = [{'id': 1, 'title': 'First updated', 'description': 'Updated', 'priority': 2, 'complete': True},
+                    {'id': 2, 'title': 'Other updated', 'description': 'Updated', 'priority': 3, 'complete': True}]
+    response = client.patch('/todo/batch', json=request_data)
+    assert response.status_code == 404
+
+    db = TestingSessionLocal()
+    assert db.query(Todos).filter(Todos.id == 1).first().title == 'Learn to code!'
+
+
+def test_delete_todos_batch(test_todo):
+    db = TestingSessionLocal()
+    db.add(Todos(title='Second', description='Second todo', priority=1, complete=False, owner_id=1))
+    db.commit()
+
+    response = client.request('DELETE', '/todo/batch', json=[1, 2])
+    assert response.status_code == 204
+
+    db = TestingSessionLocal()
+    assert db.query(Todos).count() == 0
+
+
+def test_delete_todos_batch_not_found(test_todo):
+    response = client.request('DELETE', '/todo/batch', json=[1, 999])
+    assert response.status_code == 404
+
+    db = TestingSessionLocal()
+    assert db.query(Todos).filter(Todos.id == 1).first() is not None
+
+
+def test_read_all_etag_not_modified(test_todo):
+    response = client.get('/')
+    etag = response.headers['ETag']
+
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.content == b''
+
+
+def test_read_all_served_from_cache_until_write(test_todo):
+    client.get('/')
+    db = TestingSessionLocal()
+    db.add(Todos(title='Direct', description='Written around the API', priority=1, complete=False, owner_id=1))
+    db.commit()
+    assert len(client.get('/').json()) == 1
+
+    etag = client.get('/').headers['ETag']
+    client.put('/todo/1', json={'title': 'Changed', 'description': 'Need to learn everyday!',
+                                'priority': 5, 'complete': False})
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert [todo['title'] for todo in response.json()] == ['Changed', 'Direct']
+
+
+def test_read_one_etag_not_modified(test_todo):
+    response = client.get('/todo/1')
+    etag = response.headers['ETag']
+    assert client.get('/todo/1', headers={'If-None-Match': etag}).status_code == 304
+
+    client.delete('/todo/1')
+    assert client.get('/todo/1', headers={'If-None-Match': etag}).status_code == 404
+
+
+def test_search_todos(test_todo):
+    db = TestingSessionLocal()
+    db.add_all([Todos(title='Buy groceries', description='Milk and bread', priority=1, complete=False, owner_id=1),
+                Todos(title='Read a book', description='Learn about databases', priority=2, complete=False, owner_id=1),
+                Todos(title='Learn Rust', description='Other owner', priority=1, complete=False, owner_id=2)])
+    db.commit()
+
+    response = client.get('/todo/search?q=learn')
+    assert response.status_code == status.HTTP_200_OK
+    assert sorted(todo['id'] for todo in response.json()) == [1, 3]
+
+    response = client.get('/todo/search?q=bre')
+    assert [todo['title'] for todo in response.json()] == ['Buy groceries']
+
+    response = client.get('/todo/search?q=learn databases')
+    assert [todo['title'] for todo in response.json()] == ['Read a book']
+
+
+def test_search_todos_follows_writes(test_todo):
+    client.put('/todo/1', json={'title': 'Practice piano', 'description': 'Scales every day',
+                                'priority': 5, 'complete': False})
+    assert client.get('/todo/search?q=code').json() == []
+    assert [todo['id'] for todo in client.get('/todo/search?q=piano').json()] == [1]
+
+    client.delete('/todo/1')
+    assert client.get('/todo/search?q=piano').json() == []
+
+
+def test_search_todos_ignores_query_syntax(test_todo):
+    response = client.get('/todo/search?q="code* (')
+    assert response.status_code == status.HTTP_200_OK
+    assert [todo['id'] for todo in response.json()] == [1]
+
+    response = client.get('/todo/search?q=%22%28')
+    assert response.json() == []
+
+
+def test_read_todo_changes(test_todo):
+    since = client.get('/todo/changes').json()['revision']
+    created = client.post('/todo', json={'title': 'New todo', 'description': 'Sync me',
+                                         'priority': 3, 'complete': False}).json()
+    client.put('/todo/1', json={'title': 'Changed', 'description': 'Sync me too',
+                                'priority': 2, 'complete': True})
+
+    response = client.get(f'/todo/changes?since={since}')
+    assert response.status_code == status.HTTP_200_OK
+    changes = response.json()
+    assert [todo['id'] for todo in changes['todos']] == [created['id'], 1]
+    assert changes['todos'][1]['title'] == 'Changed'
+    assert changes['todos'][1]['updated_at'] is not None
+    assert changes['deleted'] == []
+    assert changes['has_more'] is False
+    assert changes['revision'] == changes['todos'][1]['revision'] > since
+
+    since = changes['revision']
+    client.delete(f"/todo/{created['id']}")
+    changes = client.get(f'/todo/changes?since={since}').json()
+    assert changes['todos'] == []
+    assert changes['deleted'] == [created['id']]
+
+    unchanged = client.get(f"/todo/changes?since={changes['revision']}").json()
+    assert unchanged == {'revision': changes['revision'], 'has_more': False, 'todos': [], 'deleted': []}
 
 
+@pytest.mark.asyncio
+async def test_revisions_are_allocated_per_owner():
+    async with TestingAsyncSessionLocal() as db:
+        assert await allocate_revisions(db, 101, 2) == 1
+        assert await allocate_revisions(db, 102) == 1
+        assert await allocate_revisions(db, 101) == 3
+        await db.rollback()
 
 
+def test_read_todo_changes_paginates(test_todo):
+    since = client.get('/todo/changes').json()['revision']
+    client.post('/todo/batch', json=[{'title': f'Todo {n}', 'description': 'Batch',
+                                      'priority': 1, 'complete': False} for n in range(3)])
+    client.request('DELETE', '/todo/batch', json=[1])
 
+    first = client.get(f'/todo/changes?since={since}&limit=2').json()
+    assert [todo['title'] for todo in first['todos']] == ['Todo 0', 'Todo 1']
+    assert first['has_more'] is True
 
+    rest = client.get(f"/todo/changes?since={first['revision']}&limit=2").json()
+    assert [todo['title'] for todo in rest['todos']] == ['Todo 2']
+    assert rest['deleted'] == [1]
+    assert rest['has_more'] is False
 
 
+def test_event_stream_requires_token():
+    response = client.get('/todo/events')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
+    access = create_access_token('testuser', 1, 'user', timedelta(minutes=5))
+    response = client.get('/todo/events', params={'token': access})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+def test_create_event_ticket():
+    access = create_access_token('testuser', 1, 'user', timedelta(minutes=5))
+    response = client.post('/todo/events/ticket', headers={'Authorization': f'Bearer {access}'})
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body['expires_in'] == get_settings().event_ticket_seconds
+    assert jwt.get_unverified_claims(body['ticket'])['type'] == 'stream'
+
+    response = client.post('/todo/events/ticket')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_create_todo_idempotency_key_replays(test_todo):
+    request_data = {'title': 'Pay rent', 'description': 'Only once', 'priority': 4, 'complete': False}
+    headers = {'Idempotency-Key': 'rent-2026-10'}
+
+    first = client.post('/todo', json=request_data, headers=headers)
+    retry = client.post('/todo', json=request_data, headers=headers)
+
+    assert first.status_code == retry.status_code == status.HTTP_201_CREATED
+    assert retry.json() == first.json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    db = TestingSessionLocal()
+    assert db.query(Todos).filter(Todos.title == 'Pay rent').count() == 1
+
+    response = client.post('/todo', json={**request_data, 'priority': 1}, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
+def test_update_todo_if_match(test_todo):
+    etag = client.get('/todo/1').headers['ETag']
+    assert etag == '"1-0"'
+    request_data = {'title': 'Edited once', 'description': 'First editor wins',
+                    'priority': 3, 'complete': False}
+
+    response = client.put('/todo/1', json=request_data, headers={'If-Match': etag})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert response.headers['ETag'] == '"1-1"'
+
+    response = client.put('/todo/1', json={**request_data, 'title': 'Edited twice'}, headers={'If-Match': etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert response.headers['ETag'] == '"1-1"'
+    assert client.get('/todo/1').json()['title'] == 'Edited once'
+
+    response = client.put('/todo/1', json=request_data, headers={'If-Match': 'W/"1-1"'})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+    response = client.put('/todo/1', json=request_data)
+    assert response.headers['ETag'] == '"1-2"'
+    assert client.get('/todo/1').headers['ETag'] == '"1-2"'
+
+    response = client.put('/todo/999', json=request_data, headers={'If-Match': '"999-2"'})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_if_match_does_not_accept_another_todos_etag(test_todo):
+    db = TestingSessionLocal()
+    db.add(Todos(title='Second', description='Same revision', priority=1, complete=False,
+                 owner_id=1, revision=0))
+    db.commit()
+    other = client.get('/todo/2').headers['ETag']
+    assert other == '"2-0"'
+
+    response = client.patch('/todo/1', json={'priority': 2}, headers={'If-Match': other})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert response.headers['ETag'] == client.get('/todo/1').headers['ETag'] == '"1-0"'
+
+
+def test_patch_todo(test_todo):
+    response = client.patch('/todo/1', json={'priority': 2}, headers={'If-Match': '"1-0"'})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert response.headers['ETag'] == '"1-1"'
+
+    db = TestingSessionLocal()
+    model = db.query(Todos).filter(Todos.id == 1).first()
+    assert model.priority == 2
+    assert model.title == 'Learn to code!'
+    assert model.version == 2
+
+    response = client.patch('/todo/1', json={'complete': True}, headers={'If-Match': '"1-0"'})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert client.patch('/todo/1', json={}).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.patch('/todo/1', json={'title': None}).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.patch('/todo/999', json={'complete': True}).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_batch_update_bumps_versions(test_todo):
+    response = client.patch('/todo/batch', json=[{'id': 1, 'title': 'Batch edit', 'description': 'Batch',
+                                                 'priority': 1, 'complete': True}])
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert client.get('/todo/1').headers['ETag'] == '"1-1"'
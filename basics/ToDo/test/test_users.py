@@ -1,6 +1,10 @@
 from .utils import *
 from ..routers.user import get_db, get_current_user
-from fastapi import status
+from ..routers.auth import create_access_token, create_refresh_token
+from ..revocation import revocation_store
+from datetime import timedelta
+from fastapi import HTTPException, status
+import pytest
 
 app.dependency_overrides[get_db] = override_get_db
 app.dependency_overrides[get_current_user] = override_get_current_user
@@ -16,12 +20,41 @@ def test_return_user(test_user):
     assert response.json()['phone_number'] == '(111)-111-1111'
 
 
+def test_return_user_hides_password(test_user):
+    response = client.get("/user")
+    assert response.status_code == status.HTTP_200_OK
+    assert 'hashed_password' not in response.json()
+    assert set(response.json()) == {'id', 'username', 'email', 'first_name', 'last_name',
+                                    'role', 'is_active', 'phone_number'}
+
+
 def test_change_password_success(test_user):
     response = client.put("/user/password", json={"password": "testpassword",
                                                   "new_password": "newpassword"})
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
 
+@pytest.mark.asyncio
+async def test_change_password_revokes_existing_tokens(test_user):
+    revocation_store.clear()
+    access = create_access_token('Admin', test_user.id, 'admin', timedelta(minutes=5))
+    refresh = create_refresh_token('Admin', test_user.id, 'admin', timedelta(minutes=5))
+    assert (await get_current_user(token=access))['id'] == test_user.id
+
+    try:
+        response = client.put("/user/password", json={"password": "testpassword",
+                                                      "new_password": "newpassword"})
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        with pytest.raises(HTTPException) as excinfo:
+            await get_current_user(token=access)
+        assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED
+        response = client.post('/auth/refresh', json={'refresh_token': refresh})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    finally:
+        revocation_store.clear()
+
+
 def test_change_password_invalid_current_password(test_user):
     response = client.put("/user/password", json={"password": "wrong_password",
                                                   "new_password": "newpassword"})
@@ -1,12 +1,20 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.pool import StaticPool
 from sqlalchemy.orm import sessionmaker
-from ..database import Base
+from ..database import Base, to_async_url
+from ..search import create_search_index
 from ..main import app
 from fastapi.testclient import TestClient
+import asyncio
+import fnmatch
 import pytest
 from ..models import Todos, Users
 from ..routers.auth import bcrypt_context
+from ..cache import todo_cache
+from ..idempotency import idempotency_store
+from ..rate_limit import rate_limiter
+from ..instrumentation import app_metrics
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./testdb.db"
 
@@ -18,20 +26,60 @@ engine = create_engine(
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL))
+
+app_metrics.instrument(async_engine.sync_engine)
+
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base.metadata.create_all(bind=engine)
+create_search_index(engine)
 
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
+async def override_get_db():
+    async with TestingAsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+class FakeRedis:
+    """In-memory stand-in for the asyncio Redis client used by the cache backends."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def unlink(self, *keys):
+        await self.delete(*keys)
+
+    async def scan_iter(self, match="*", count=None):
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
 
 def override_get_current_user():
-    return {'username': 'Admin', 'id': 1, 'user_role': 'admin'}
+    return {'username': 'Admin', 'id': 1, 'role': 'admin'}
 
 client = TestClient(app)
 
+@pytest.fixture(autouse=True)
+def reset_shared_state():
+    # Tests write to the database directly, bypassing cache invalidation,
+    # and share one client address for rate limiting.
+    asyncio.run(todo_cache.clear())
+    asyncio.run(rate_limiter.clear())
+    asyncio.run(idempotency_store.clear())
+    yield
+
 @pytest.fixture
 def test_todo():
     todo = Todos(
@@ -48,6 +96,8 @@ def test_todo():
     yield todo
     with engine.connect() as connection:
         connection.execute(text("DELETE FROM todos;"))
+        connection.execute(text("DELETE FROM todo_tombstones;"))
+        connection.execute(text("DELETE FROM todo_revisions;"))
         connection.commit()
 
 
@@ -0,0 +1,106 @@
+import hashlib
+import time
+from collections import OrderedDict
+from .settings import get_settings
+
+class TokenCache:
+    """
+    LRU cache of verified access token claims.
+
+    Entries are keyed by the SHA-256 digest of the token, so raw tokens are
+    never kept in memory, and expire at the token's ``exp`` claim or after
+    ``ttl`` seconds, whichever comes first. All tokens of a user can be
+    dropped at once with :meth:`invalidate_user`.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._by_user = {}
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str):
+        """
+        Return the cached claims for a token.
+
+        Args:
+            token (str): The bearer token.
+
+        Returns:
+            dict: A copy of the cached claims, or None on a miss or expiry.
+        """
+        key = self.digest(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(entry[1])
+
+    def put(self, token: str, claims: dict, expires_at=None):
+        """
+        Cache the verified claims of a token.
+
+        Args:
+            token (str): The bearer token.
+            claims (dict): The claims returned to callers; must contain "id".
+            expires_at (float): The token's ``exp`` as a Unix timestamp, if any.
+        """
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        key = self.digest(token)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (deadline, dict(claims))
+        self._by_user.setdefault(claims["id"], set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, token: str):
+        """Drop a single token from the cache."""
+        key = self.digest(token)
+        if key in self._entries:
+            self._remove(key)
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token belonging to ``user_id``."""
+        for key in self._by_user.pop(user_id, ()):
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_user.clear()
+
+    def _remove(self, key):
+        _, claims = self._entries.pop(key)
+        keys = self._by_user.get(claims["id"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[claims["id"]]
+
+    def stats(self):
+        """
+        Return the cache size and hit/miss counters.
+
+        Returns:
+            dict: Entry count, capacity, hits, misses and hit ratio.
+        """
+        lookups = self.hits + self.misses
+        return {"size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0}
+
+token_cache = TokenCache(get_settings().token_cache_size, get_settings().token_cache_ttl)
@@ -0,0 +1,393 @@
+import heapq
+import os
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import Optional
+from pydantic import BaseModel, Field
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, func, select
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from ToDo.engine_config import engine_options, sqlite_pragmas, to_async_url
+
+SORT_KEYS = ("id", "title", "author", "rating", "published_date")
+
+class BookSettings(BaseModel):
+    """
+    Books API settings.
+
+    Each field is overridden by an environment variable named after the
+    upper-cased field with a ``BOOKS_`` prefix, e.g. ``BOOKS_DATABASE_URL``
+    or ``BOOKS_DB_POOL_SIZE``. The pool fields mirror the ToDo app's, so
+    both build their engines with `ToDo.engine_config`.
+    """
+
+    database_url: Optional[str] = None
+    db_pool_size: int = Field(default=5, gt=0)
+    db_max_overflow: int = Field(default=10, ge=0)
+    db_pool_timeout: float = Field(default=30, gt=0)
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    sqlite_busy_timeout_ms: int = Field(default=5000, ge=0)
+
+def load_book_settings(environ=None):
+    """
+    Build a `BookSettings` object from ``BOOKS_``-prefixed environment variables.
+
+    Args:
+        environ (Mapping): The environment to read, `os.environ` by default.
+
+    Returns:
+        BookSettings: The validated settings.
+    """
+    environ = os.environ if environ is None else environ
+    values = {}
+    for name in BookSettings.model_fields:
+        if f"BOOKS_{name.upper()}" in environ:
+            values[name] = environ[f"BOOKS_{name.upper()}"]
+    return BookSettings(**values)
+
+class Book:
+    __slots__ = ("id", "title", "author", "description", "rating", "published_date")
+
+    id: int
+    title: str
+    author: str
+    description: str
+    rating: int
+    published_date: int
+
+    def __init__(self, id, title, author, description, rating, published_date):
+        self.id = id
+        self.title = title
+        self.author = author
+        self.description = description
+        self.rating = rating
+        self.published_date = published_date
+
+class MemoryBookStore:
+    """
+    In-memory book catalogue indexed by id, rating, author and published date.
+
+    Books are kept in a dict keyed by id; each secondary index maps a value
+    to a dict of the books having it, so lookups cost O(1) plus the number
+    of matches and removals never shift a list. Authors are indexed
+    case-insensitively. The distinct ratings, authors and years are also
+    kept in sorted lists so ranges and author prefixes are found by
+    bisection.
+
+    Every worker process has its own copy and everything is lost on
+    restart; use `SQLBookStore` for anything but a single dev worker.
+    """
+
+    def __init__(self, books=()):
+        self._books = {}
+        self._by_rating = defaultdict(dict)
+        self._by_author = defaultdict(dict)
+        self._by_published_date = defaultdict(dict)
+        self._ratings = []
+        self._authors = []
+        self._years = []
+        self._next_id = 1
+        for book in books:
+            self._put(book)
+
+    async def setup(self):
+        pass
+
+    async def dispose(self):
+        pass
+
+    async def all(self):
+        return list(self._books.values())
+
+    async def get(self, book_id):
+        return self._books.get(book_id)
+
+    async def by_rating(self, rating):
+        return list(self._by_rating.get(rating, {}).values())
+
+    async def by_author(self, author):
+        return list(self._by_author.get(author.lower(), {}).values())
+
+    async def by_published_date(self, published_date):
+        return list(self._by_published_date.get(published_date, {}).values())
+
+    async def query(self, min_rating=None, max_rating=None, author=None, min_year=None,
+                    max_year=None, sort="id", descending=False, limit=100, offset=0):
+        """
+        Return the books matching every given predicate, sorted and sliced.
+
+        Each predicate yields the ids found in its index range; the sets are
+        intersected smallest first and only ``offset + limit`` books are
+        sorted out of the matches.
+
+        Args:
+            min_rating (int): The lowest rating to include.
+            max_rating (int): The highest rating to include.
+            author (str): A case-insensitive prefix of the author's name.
+            min_year (int): The earliest published year to include.
+            max_year (int): The latest published year to include.
+            sort (str): One of `SORT_KEYS`.
+            descending (bool): Sort from the highest value down.
+            limit (int): The maximum number of books to return.
+            offset (int): The number of matching books to skip.
+
+        Returns:
+            list[Book]: The requested slice of matching books.
+        """
+        matches = []
+        if min_rating is not None or max_rating is not None:
+            matches.append(self._range(self._by_rating, self._ratings, min_rating, max_rating))
+        if author:
+            matches.append(self._author_prefix(author.lower()))
+        if min_year is not None or max_year is not None:
+            matches.append(self._range(self._by_published_date, self._years, min_year, max_year))
+        if matches:
+            matches.sort(key=len)
+            books = [self._books[book_id] for book_id in matches[0].intersection(*matches[1:])]
+        else:
+            books = self._books.values()
+        select = heapq.nlargest if descending else heapq.nsmallest
+        return select(offset + limit, books, key=sort_key(sort))[offset:]
+
+    def _range(self, index, keys, low, high):
+        start = 0 if low is None else bisect_left(keys, low)
+        stop = len(keys) if high is None else bisect_right(keys, high)
+        ids = set()
+        for key in keys[start:stop]:
+            ids.update(index[key])
+        return ids
+
+    def _author_prefix(self, prefix):
+        ids = set()
+        for position in range(bisect_left(self._authors, prefix), len(self._authors)):
+            key = self._authors[position]
+            if not key.startswith(prefix):
+                break
+            ids.update(self._by_author[key])
+        return ids
+
+    async def add(self, book):
+        """
+        Store a new book under the next free id.
+
+        Returns:
+            Book: The stored book, with its id set.
+        """
+        book.id = self._next_id
+        return self._put(book)
+
+    async def update(self, book):
+        """
+        Replace the stored book with the same id.
+
+        Returns:
+            bool: False if no book has that id.
+        """
+        if book.id not in self._books:
+            return False
+        self._put(book)
+        return True
+
+    async def delete(self, book_id):
+        """
+        Remove a book by id.
+
+        Returns:
+            bool: False if no book has that id.
+        """
+        book = self._books.pop(book_id, None)
+        if book is None:
+            return False
+        self._unindex(book)
+        return True
+
+    def _put(self, book):
+        self._next_id = max(self._next_id, book.id + 1)
+        if book.id in self._books:
+            self._unindex(self._books[book.id])
+        self._books[book.id] = book
+        self._index(book)
+        return book
+
+    def _indexes(self, book):
+        yield self._by_rating, self._ratings, book.rating
+        yield self._by_author, self._authors, book.author.lower()
+        # Books without a year are looked up by value but never match a range.
+        yield self._by_published_date, None if book.published_date is None else self._years, book.published_date
+
+    def _index(self, book):
+        for index, keys, key in self._indexes(book):
+            if key not in index and keys is not None:
+                insort(keys, key)
+            index[key][book.id] = book
+
+    def _unindex(self, book):
+        for index, keys, key in self._indexes(book):
+            del index[key][book.id]
+            if not index[key]:
+                del index[key]
+                if keys is not None:
+                    del keys[bisect_left(keys, key)]
+
+def sort_key(sort):
+    """
+    Return the key function ordering books by ``sort``, then by id.
+
+    Books without a published year sort before every year, as NULLs do in
+    SQLite and MySQL.
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key '{sort}'")
+    if sort == "id":
+        return lambda book: book.id
+    if sort == "published_date":
+        return lambda book: (book.published_date is not None, book.published_date or 0, book.id)
+    return lambda book: (getattr(book, sort), book.id)
+
+metadata = MetaData()
+
+books_table = Table(
+    "books", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("title", String, nullable=False),
+    Column("author", String, nullable=False),
+    Column("description", String, nullable=False),
+    Column("rating", Integer, nullable=False, index=True),
+    Column("published_date", Integer, index=True),
+    sqlite_autoincrement=True,
+)
+Index("ix_books_author_lower", func.lower(books_table.c.author))
+
+class SQLBookStore:
+    """
+    Book catalogue stored in a SQL database.
+
+    The engine is built with the same options, async drivers and SQLite
+    pragmas as the ToDo app's (see `ToDo.engine_config`). Ids are allocated by
+    the database's autoincrement primary key, so any number of workers can
+    insert concurrently without handing out the same id twice, and lookups
+    go through the indexes on rating, lower(author) and published_date
+    instead of loading the catalogue into memory.
+    """
+
+    def __init__(self, url, settings=None):
+        settings = settings or BookSettings()
+        self.engine = create_async_engine(to_async_url(url), **engine_options(url, settings))
+        if make_url(url).get_backend_name() == "sqlite":
+            event.listen(self.engine.sync_engine, "connect", sqlite_pragmas(settings.sqlite_busy_timeout_ms))
+
+    async def setup(self):
+        """Create the books table and its indexes if they are missing."""
+        async with self.engine.begin() as connection:
+            await connection.run_sync(metadata.create_all)
+
+    async def dispose(self):
+        await self.engine.dispose()
+
+    async def _select(self, *criteria):
+        stmt = select(books_table).filter(*criteria).order_by(books_table.c.id)
+        async with self.engine.connect() as connection:
+            result = await connection.execute(stmt)
+            return [Book(*row) for row in result]
+
+    async def all(self):
+        return await self._select()
+
+    async def get(self, book_id):
+        books = await self._select(books_table.c.id == book_id)
+        return books[0] if books else None
+
+    async def by_rating(self, rating):
+        return await self._select(books_table.c.rating == rating)
+
+    async def by_author(self, author):
+        return await self._select(func.lower(books_table.c.author) == author.lower())
+
+    async def by_published_date(self, published_date):
+        return await self._select(books_table.c.published_date == published_date)
+
+    async def query(self, min_rating=None, max_rating=None, author=None, min_year=None,
+                    max_year=None, sort="id", descending=False, limit=100, offset=0):
+        """
+        Return the books matching every given predicate, sorted and sliced.
+
+        See `MemoryBookStore.query`; the filtering, ordering and slicing all
+        run in the database.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key '{sort}'")
+        table = books_table.c
+        stmt = select(books_table)
+        if min_rating is not None:
+            stmt = stmt.filter(table.rating >= min_rating)
+        if max_rating is not None:
+            stmt = stmt.filter(table.rating <= max_rating)
+        if author:
+            stmt = stmt.filter(func.lower(table.author).startswith(author.lower(), autoescape=True))
+        if min_year is not None:
+            stmt = stmt.filter(table.published_date >= min_year)
+        if max_year is not None:
+            stmt = stmt.filter(table.published_date <= max_year)
+        order = [table[sort], table.id] if sort != "id" else [table.id]
+        if descending:
+            order = [column.desc() for column in order]
+        stmt = stmt.order_by(*order).limit(limit).offset(offset)
+        async with self.engine.connect() as connection:
+            result = await connection.execute(stmt)
+            return [Book(*row) for row in result]
+
+    async def add(self, book):
+        """
+        Insert a new book and let the database assign its id.
+
+        Returns:
+            Book: The stored book, with its id set.
+        """
+        values = {name: getattr(book, name) for name in Book.__slots__ if name != "id"}
+        async with self.engine.begin() as connection:
+            result = await connection.execute(books_table.insert().values(**values))
+        book.id = result.inserted_primary_key[0]
+        return book
+
+    async def update(self, book):
+        """
+        Replace the stored book with the same id.
+
+        Returns:
+            bool: False if no book has that id.
+        """
+        values = {name: getattr(book, name) for name in Book.__slots__ if name != "id"}
+        stmt = books_table.update().where(books_table.c.id == book.id).values(**values)
+        async with self.engine.begin() as connection:
+            result = await connection.execute(stmt)
+        return result.rowcount > 0
+
+    async def delete(self, book_id):
+        """
+        Remove a book by id.
+
+        Returns:
+            bool: False if no book has that id.
+        """
+        async with self.engine.begin() as connection:
+            result = await connection.execute(books_table.delete().where(books_table.c.id == book_id))
+        return result.rowcount > 0
+
+def create_book_store(url=None, books=(), settings=None):
+    """
+    Create the book store for ``url``.
+
+    Args:
+        url (str): A SQLAlchemy database URL; without one the catalogue is
+            kept in memory.
+        books (Iterable[Book]): The books an in-memory store starts with.
+        settings (BookSettings): The pool configuration of a SQL store.
+
+    Returns:
+        MemoryBookStore | SQLBookStore: The configured store.
+    """
+    if url:
+        return SQLBookStore(url, settings)
+    return MemoryBookStore(books)
@@ -1,25 +1,10 @@
+from contextlib import asynccontextmanager
 from fastapi import Body, FastAPI, Path, Query, HTTPException
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Literal, Optional
 from starlette import status
+from book_storage import Book, create_book_store, load_book_settings
 
-app = FastAPI()
-
-class Book:
-    id: int
-    title: str
-    author: str
-    description: str
-    rating: int
-    published_date: int
-
-    def __init__(self, id, title, author, description, rating, published_date):
-        self.id = id
-        self.title = title
-        self.author = author
-        self.description = description
-        self.rating = rating
-        self.published_date = published_date
 
 class BookRequest(BaseModel):
     id: Optional[int] = Field(description='field is fulfill automatically', default=None)
@@ -40,7 +25,17 @@ class BookRequest(BaseModel):
         }
     }
     
-BOOKS=[
+class BookResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    author: str
+    description: str
+    rating: int
+    published_date: Optional[int] = None
+
+SAMPLE_BOOKS = [
     Book(1, "To Kill a Mockingbird", "Harper Lee", "A novel set in the American South during the 1930s, focusing on the Finch family and the moral challenges they face.",5, None),
     Book(2, "1984", "George Orwell", "A dystopian novel exploring themes of totalitarianism, surveillance, and individual freedom.", 5, None),
     Book(3, "The Great Gatsby", "F. Scott Fitzgerald", "A story about the mysterious millionaire Jay Gatsby and his obsession with Daisy Buchanan during the Roaring Twenties.", 4, None),
@@ -53,62 +48,68 @@ BOOKS=[
     Book(10, "The Brothers Karamazov", "Fyodor Dostoevsky", "A philosophical and psychological novel that delves into themes of faith, doubt, and morality.", 5, None)
 ]
 
-@app.get("/")
+# Set BOOKS_DATABASE_URL to keep the catalogue in a database shared by all
+# workers; without it the sample books are served from memory.
+BOOK_SETTINGS = load_book_settings()
+BOOKS = create_book_store(BOOK_SETTINGS.database_url, SAMPLE_BOOKS, BOOK_SETTINGS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await BOOKS.setup()
+    yield
+    await BOOKS.dispose()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.get("/", response_model=list[BookResponse])
 async def read_all_books():
-    return BOOKS
+    return await BOOKS.all()
 
-@app.get("/books", status_code=status.HTTP_200_OK)
+@app.get("/books", status_code=status.HTTP_200_OK, response_model=list[BookResponse])
 async def read_all_books():
-    return BOOKS
+    return await BOOKS.all()
 
-@app.get("/books/{book_id}", status_code=status.HTTP_200_OK)
+@app.get("/books/query", status_code=status.HTTP_200_OK, response_model=list[BookResponse])
+async def query_books(min_rating: Optional[int] = Query(default=None, gt=0, lt=6),
+                      max_rating: Optional[int] = Query(default=None, gt=0, lt=6),
+                      author: Optional[str] = Query(default=None, min_length=1, description="author name prefix"),
+                      min_year: Optional[int] = None,
+                      max_year: Optional[int] = None,
+                      sort: Literal["id", "title", "author", "rating", "published_date"] = "id",
+                      order: Literal["asc", "desc"] = "asc",
+                      limit: int = Query(default=100, gt=0, le=1000),
+                      offset: int = Query(default=0, ge=0)):
+    return await BOOKS.query(min_rating=min_rating, max_rating=max_rating, author=author,
+                             min_year=min_year, max_year=max_year, sort=sort,
+                             descending=order == "desc", limit=limit, offset=offset)
+
+@app.get("/books/{book_id}", status_code=status.HTTP_200_OK, response_model=BookResponse)
 async def find_book_id(book_id: int = Path(gt=0)):
-    for book in BOOKS:
-        if book.id == book_id:
-            return book
-    raise HTTPException(status_code=404, detail="Book not found")
+    book = await BOOKS.get(book_id)
+    if book is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return book
         
-@app.get("/books/{published_date}", status_code=status.HTTP_200_OK)
+@app.get("/books/{published_date}", status_code=status.HTTP_200_OK, response_model=list[BookResponse])
 async def find_book_by_published_date(published_date: int):
-    books_to_return = []
-    for i in range(len(BOOKS)):
-        if BOOKS[i].published_date == published_date:
-            books_to_return.append(BOOKS[i])
-    return books_to_return
+    return await BOOKS.by_published_date(published_date)
         
 @app.put("/books/update_book", status_code=status.HTTP_204_NO_CONTENT)
 async def update_book(book: BookRequest):
-    book_changed = False
-    for i in range(len(BOOKS)):
-        if BOOKS[i].id == book.id:
-            BOOKS[i] = book
-            book_changed=True
-            break
-        if not book_changed:
-            raise HTTPException(status_code=404, detail="Book not found")
+    if book.id is None or not await BOOKS.update(Book(**book.model_dump())):
+        raise HTTPException(status_code=404, detail="Book not found")
         
-@app.get("/books/", status_code=status.HTTP_200_OK)
+@app.get("/books/", status_code=status.HTTP_200_OK, response_model=list[BookResponse])
 async def find_book_by_rating(book_rating: int = Query(gt=0, lt=6)):
-    books_to_return = []
-    for book in BOOKS:
-        if book.rating == book_rating:
-            books_to_return.append(book)
-    return books_to_return
+    return await BOOKS.by_rating(book_rating)
 
 @app.post("/create_book", status_code=status.HTTP_201_CREATED)
 async def create_book(book_request: BookRequest):
     new_book = Book(**book_request.model_dump())
-    BOOKS.append(find_id_book(new_book))
+    new_book.id = None
+    await BOOKS.add(new_book)
 
 @app.delete("/books/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_book_by_id(book_id: int = Path(gt=0)):
-    for i in range(len(BOOKS)):
-        if BOOKS[i].id == book_id:
-            BOOKS.pop(i)
-            break
-
-    
-async def find_id_book(book: Book):
-    book.id = 1 if len(BOOKS) == 0 else BOOKS[-1].id + 1
-    return book
-  
+    if not await BOOKS.delete(book_id):
+        raise HTTPException(status_code=404, detail="Book not found")